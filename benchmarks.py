@@ -0,0 +1,461 @@
+"""
+Benchmarks of the WFC-CSP solvers, the fixed parameter search and the test
+case corpus. Every instance is generated from BENCHMARK_SEED, so runs of
+different engines or commits time the same work.
+
+usage: python benchmarks.py [--suite startup,micro,macro,gate,check] [--repeat N]
+                            [--warmup N] [--full-grid] [--json filename]
+       python benchmarks.py --save-baseline filename
+       python benchmarks.py --gate baseline filename [--tolerance T]
+                            [--success-tolerance T] [--ops-tolerance T]
+
+The operation counts of the gate come from WFCStats and CSdStats. The gate
+exits with status 1 if the success rate drops or the operation counts grow
+beyond the tolerances against the baseline. Both are the same on every run
+of the same commit. The throughput is only reported against the baseline,
+unless --tolerance gives the allowed relative throughput loss.
+
+The check suite runs no timings: it checks that the iterative CSd returns
+the same strings as the recursive CSd of fixedParameterAlgorithm.py for the
+same seeds, and exits with status 1 on any difference.
+"""
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# seed of all benchmark instances and solver runs
+BENCHMARK_SEED = 12345
+# sweep cells timed by default, a subset of the TEST_CONFIGURATION grid
+BENCHMARK_GRID = {'K': [10, 40], 'd': [5, 20], 'L': [40, 160]}
+# test cases per cell of the macro benchmarks
+BENCHMARK_CASES = 8
+# maximum number of tries of solveWithRestarts in the macro benchmarks
+BENCHMARK_MAX_TRIES = 100
+# CSd is exponential in d, it is only timed for cells with d up to this
+BENCHMARK_CSD_MAX_D = 5
+# sweep cells of the regression gate, (K, d, L); the last one fails often
+# enough on the first try to exercise the restarts
+GATE_CELLS = [(10, 5, 40), (20, 10, 80), (10, 15, 40)]
+# test cases per gate cell
+GATE_CASES = 20
+# minimum seconds of every timed gate sample, the gate functions are called
+# repeatedly until then, so one sample is not dominated by machine noise
+GATE_MIN_TIME = 0.2
+# default allowed relative throughput loss (None: throughput is only
+# reported), absolute success rate loss and relative operation count growth
+# before the gate fails
+GATE_TOLERANCE = None
+GATE_SUCCESS_TOLERANCE = 0.05
+GATE_OPS_TOLERANCE = 0.05
+# sweep cells and test cases per cell of the CSd check
+CHECK_CELLS = [(5, 2, 10), (10, 3, 20), (10, 5, 40)]
+CHECK_CASES = 40
+# import statements timed by bench_startup, each in a fresh interpreter
+STARTUP_IMPORTS = [
+    ("python", "pass"),
+    ("numpy", "import numpy"),
+    ("closestStringProblem", "import closestStringProblem"),
+    ("pandas", "import pandas"),
+    ("matplotlib", "import matplotlib.pyplot"),
+]
+
+
+def summarize(samples):
+    """
+    :param samples: measured times in seconds
+    :return: dict of the median, 95th percentile, minimum and maximum
+    """
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "median": statistics.median(ordered),
+        "p95": ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)],
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+
+
+def time_subprocess(args, repeat, warmup=1):
+    """
+    :return: wall times in seconds of repeat runs of the command args, after
+             warmup runs that fill the file system caches
+    """
+    samples = []
+    for run in range(warmup + repeat):
+        startTime = time.perf_counter()
+        subprocess.run(args, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        if run >= warmup:
+            samples.append(time.perf_counter() - startTime)
+    return samples
+
+
+def bench_startup(repeat):
+    """
+    time the start of an interpreter that imports the solver module, and of
+    the heavy optional dependencies for comparison
+    """
+    results = {}
+    for name, statement in STARTUP_IMPORTS:
+        try:
+            samples = time_subprocess([sys.executable, "-c", statement], repeat)
+        except subprocess.CalledProcessError:
+            # optional dependency not installed
+            continue
+        results["startup/" + name] = summarize(samples)
+
+    # importing the solvers must not import the plotting and spreadsheet libraries
+    check = "import sys, closestStringProblem; sys.exit(bool({'pandas', 'matplotlib'} & set(sys.modules)))"
+    results["startup/closestStringProblem"]["lazyImports"] = \
+        subprocess.run([sys.executable, "-c", check], cwd=os.path.dirname(os.path.abspath(__file__))).returncode == 0
+    return results
+
+
+def time_function(function, repeat, warmup=1, minTime=0.0):
+    """
+    :param minTime: minimum seconds of a sample, function is called until
+                    then and the sample is the mean time of those calls
+    :return: wall times in seconds of a call of function in repeat samples,
+             after warmup samples
+    """
+    samples = []
+    for run in range(warmup + repeat):
+        calls = 0
+        startTime = time.perf_counter_ns()
+        while True:
+            function()
+            calls += 1
+            endTime = time.perf_counter_ns()
+            if endTime - startTime >= minTime * 1e9:
+                break
+        if run >= warmup:
+            samples.append((endTime - startTime) / 1e9 / calls)
+    return samples
+
+
+def benchmark_cells(fullGrid=False):
+    """
+    :return: list of (numStrings, ham, s) sweep cells to time
+    """
+    import closestStringProblem as csp
+
+    grid = csp.TEST_CONFIGURATION if fullGrid else BENCHMARK_GRID
+    alphabet = csp.TEST_CONFIGURATION['alphabet']
+    cells = []
+    for numStrings in grid['K']:
+        for ham in grid['d']:
+            for s in grid['L']:
+                if not csp.skipTest(alphabet, numStrings, ham, s):
+                    cells.append((numStrings, ham, s))
+    return cells
+
+
+def cell_corpus(cell, numCases):
+    import closestStringProblem as csp
+    from corpusGenerator import GeneratedCorpus
+
+    numStrings, ham, s = cell
+    return GeneratedCorpus(csp.TEST_CONFIGURATION['alphabet'], numCases, numStrings, s, ham, BENCHMARK_SEED)
+
+
+def bench_micro(cells, repeat, warmup):
+    """
+    time the solver building blocks on the first test case of every cell
+    """
+    import closestStringProblem as csp
+
+    results = {}
+    for cell in cells:
+        numStrings, ham, s = cell
+        suffix = "/K%d_d%d_L%d" % cell
+        testCase = cell_corpus(cell, 1)[0]
+        alphabet = testCase.alphabet
+        inputStrings = testCase.inputStrings
+        instance = testCase.encoded()
+        letterFreqTable, letterPositionTable = csp.calculateLetterFreq(inputStrings, alphabet)
+
+        benchmarks = [
+            ("calculateLetterFreq", lambda: csp.calculateLetterFreq(inputStrings, alphabet)),
+            ("calculateLetterFreq/encoded", lambda: csp.calculateLetterFreq(instance, alphabet)),
+            ("calculateScoreboard", lambda: csp.calculateScoreboard(letterFreqTable, range(s))),
+            ("findClosestString", lambda: csp.findClosestString(alphabet, instance, ham, rng=BENCHMARK_SEED)),
+            ("checkTestCase", lambda: csp.checkTestCase(numStrings, instance, None, alphabet, ham,
+                                                        rng=BENCHMARK_SEED)),
+        ]
+        if ham <= BENCHMARK_CSD_MAX_D:
+            benchmarks.append(("CSd", lambda: csp.CSd(instance, ham, instance[0], ham, rng=BENCHMARK_SEED)))
+
+        for name, function in benchmarks:
+            results["micro/" + name + suffix] = summarize(time_function(function, repeat, warmup))
+    return results
+
+
+def bench_macro(cells, repeat, warmup):
+    """
+    time whole cells: solving BENCHMARK_CASES test cases with restarts, and
+    writing and reading them as corpus file
+    """
+    import closestStringProblem as csp
+    from corpusFormat import Corpus, writeCorpus
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for cell in cells:
+            numStrings, ham, s = cell
+            suffix = "/K%d_d%d_L%d" % cell
+            testCases = cell_corpus(cell, BENCHMARK_CASES)[:]
+            instances = [testCase.encoded() for testCase in testCases]
+            corpus_filename = os.path.join(directory, "corpus" + suffix.replace("/", "_"))
+
+            def solve_cell():
+                rng = random.Random(BENCHMARK_SEED)
+                for instance in instances:
+                    csp.solveWithRestarts(instance, ham, BENCHMARK_MAX_TRIES, rng=rng)
+
+            def save_corpus():
+                writeCorpus(corpus_filename, testCases[0].alphabet,
+                            [(testCase.answerCodes, testCase.matrix, ham) for testCase in testCases])
+
+            def load_corpus():
+                for testCase in Corpus(corpus_filename):
+                    # touch the instance so its pages are read
+                    int(testCase.encoded().matrix.sum())
+
+            results["macro/solveWithRestarts" + suffix] = summarize(time_function(solve_cell, repeat, warmup))
+            results["macro/corpusSave" + suffix] = summarize(time_function(save_corpus, repeat, warmup))
+            results["macro/corpusLoad" + suffix] = summarize(time_function(load_corpus, repeat, warmup))
+    return results
+
+
+def wfc_ops(stats):
+    """
+    :return: operation counts of a WFCStats collector
+    """
+    return {"trajectories": stats.trajectories, "retries": stats.retries,
+            "positionsDecided": stats.positionsDecided, "scoreboardScans": stats.scoreboardScans,
+            "distanceUpdates": stats.distanceUpdates, "tieBreakDraws": stats.tieBreakDraws,
+            "distanceRecomputes": stats.distanceRecomputes, "tableBuilds": stats.tableBuilds}
+
+
+def bench_gate(repeat, warmup):
+    """
+    short benchmark of the regression gate: throughput, success rate and
+    operation counts of findClosestString, solveWithRestarts and CSd on
+    the GATE_CELLS
+    """
+    import closestStringProblem as csp
+    from fixedParameterSearch import NOT_FOUND, CSdStats
+    from wfcStructures import WFCStats
+
+    results = {}
+    for cell in GATE_CELLS:
+        numStrings, ham, s = cell
+        suffix = "/K%d_d%d_L%d" % cell
+        instances = [testCase.encoded() for testCase in cell_corpus(cell, GATE_CASES)]
+
+        def single_run():
+            successes = 0
+            stats = WFCStats()
+            for caseIndex, instance in enumerate(instances):
+                run = csp.runClosestString(instance, ham, rng=BENCHMARK_SEED + caseIndex, stats=stats)
+                successes += int(run.distances.max()) <= ham
+            return successes, wfc_ops(stats)
+
+        def restarts():
+            successes = 0
+            stats = WFCStats()
+            for caseIndex, instance in enumerate(instances):
+                restart = csp.solveWithRestarts(instance, ham, BENCHMARK_MAX_TRIES, rng=BENCHMARK_SEED + caseIndex,
+                                                stats=stats)
+                successes += restart.success
+            return successes, wfc_ops(stats)
+
+        def fixed_parameter():
+            successes = 0
+            stats = CSdStats()
+            for caseIndex, instance in enumerate(instances):
+                answer = csp.CSd(instance, ham, instance[0], ham, stats, rng=BENCHMARK_SEED + caseIndex)
+                successes += answer is not NOT_FOUND
+            return successes, {"nodes": stats.nodes, "prunesD0": stats.prunesD0, "prunesD1": stats.prunesD1}
+
+        benchmarks = [("findClosestString", single_run), ("solveWithRestarts", restarts)]
+        if ham <= BENCHMARK_CSD_MAX_D:
+            benchmarks.append(("CSd", fixed_parameter))
+
+        for name, function in benchmarks:
+            # every run is seeded the same, the success rate and operation
+            # counts of the last run stand for all of them
+            outcome = []
+            samples = time_function(lambda: outcome.append(function()), repeat, warmup, GATE_MIN_TIME)
+            successes, ops = outcome[-1]
+            result = summarize(samples)
+            # the fastest run is the least disturbed by other load
+            result["throughput"] = len(instances) / result["min"]
+            result["successRate"] = successes / len(instances)
+            result["ops"] = ops
+            results["gate/" + name + suffix] = result
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance=GATE_TOLERANCE, successTolerance=GATE_SUCCESS_TOLERANCE,
+                        opsTolerance=GATE_OPS_TOLERANCE):
+    """
+    :param results: results of bench_gate
+    :param baseline: results of bench_gate of the baseline
+    :param tolerance: allowed relative throughput loss, None to not gate on
+                      the throughput
+    :return: list of regression messages, empty if none
+    """
+    regressions = []
+    for name, base in baseline.items():
+        if not name.startswith("gate/"):
+            continue
+        if name not in results:
+            regressions.append("%s: missing" % name)
+            continue
+        result = results[name]
+        if tolerance is not None and result["throughput"] < base["throughput"] * (1.0 - tolerance):
+            regressions.append("%s: throughput %.1f/s, baseline %.1f/s" %
+                               (name, result["throughput"], base["throughput"]))
+        if result["successRate"] < base["successRate"] - successTolerance:
+            regressions.append("%s: success rate %.3f, baseline %.3f" %
+                               (name, result["successRate"], base["successRate"]))
+        for op, count in base["ops"].items():
+            if result["ops"].get(op, 0) > count * (1.0 + opsTolerance):
+                regressions.append("%s: %s %d, baseline %d" % (name, op, result["ops"].get(op, 0), count))
+    return regressions
+
+
+def throughput_changes(results, baseline):
+    """
+    :return: list of messages comparing the gate throughput to the baseline
+    """
+    changes = []
+    for name, base in baseline.items():
+        if name.startswith("gate/") and name in results:
+            throughput = results[name]["throughput"]
+            changes.append("%s: throughput %.1f/s, baseline %.1f/s (%+.1f%%)" %
+                           (name, throughput, base["throughput"], 100.0 * (throughput / base["throughput"] - 1.0)))
+    return changes
+
+
+def check_csd(numCases):
+    """
+    run the iterative CSd and the recursive CSd of fixedParameterAlgorithm.py
+    with the same seed on the cases of CHECK_CELLS, starting from the first
+    input string, and on a start string with a letter of no input string
+    :return: list of the differences found
+    """
+    import closestStringProblem as csp
+    import fixedParameterAlgorithm
+
+    searches = [([list("aaaa"), list("aabb"), list("bbaa")], 2, list("cccc"), 4)]
+    for cell in CHECK_CELLS:
+        for case in cell_corpus(cell, numCases):
+            inputStrings = case.inputStrings
+            searches.append((inputStrings, case.maxDistance, inputStrings[0], case.maxDistance))
+
+    differences = []
+    for index, (inputStrings, d, s, deltaD) in enumerate(searches):
+        seed = BENCHMARK_SEED + index
+        random.seed(seed)
+        expected = fixedParameterAlgorithm.CSd(inputStrings, d, list(s), deltaD)
+        result = csp.CSd(inputStrings, d, s, deltaD, rng=random.Random(seed))
+        if result != expected:
+            differences.append("search %d (K=%d, L=%d, d=%d): iterative %s, recursive %s" %
+                               (index, len(inputStrings), len(s), d, result, expected))
+    return differences
+
+
+def environment():
+    """
+    :return: dict describing what was benchmarked
+    """
+    import numpy as np
+
+    info = {"python": sys.version, "numpy": np.__version__, "seed": BENCHMARK_SEED}
+    try:
+        info["commit"] = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                                        cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+
+def print_results(results):
+    for name, result in results.items():
+        extra = ""
+        if "lazyImports" in result:
+            extra = " lazy imports %s" % result["lazyImports"]
+        if "successRate" in result:
+            extra += " %8.1f cases/s success %.3f" % (result["throughput"], result["successRate"])
+            extra += "".join(" %s %d" % (op, count) for op, count in sorted(result["ops"].items()))
+        print("%-50s median %10.3f ms  p95 %10.3f ms  (%d runs)%s" %
+              (name, result["median"] * 1000.0, result["p95"] * 1000.0, result["runs"], extra))
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from closestStringProblem import pop_option
+
+    argv = sys.argv[:]
+    baseline_filename = pop_option(argv, "--gate")
+    save_baseline_filename = pop_option(argv, "--save-baseline")
+    defaultSuites = "gate" if baseline_filename or save_baseline_filename else "startup,micro,macro"
+    suites = pop_option(argv, "--suite", defaultSuites).split(",")
+    repeat = int(pop_option(argv, "--repeat", 10))
+    warmup = int(pop_option(argv, "--warmup", 1))
+    json_filename = pop_option(argv, "--json")
+    tolerance = pop_option(argv, "--tolerance", GATE_TOLERANCE)
+    if tolerance is not None:
+        tolerance = float(tolerance)
+    successTolerance = float(pop_option(argv, "--success-tolerance", GATE_SUCCESS_TOLERANCE))
+    opsTolerance = float(pop_option(argv, "--ops-tolerance", GATE_OPS_TOLERANCE))
+    fullGrid = "--full-grid" in argv
+    cells = benchmark_cells(fullGrid)
+
+    results = {}
+    if "gate" in suites:
+        results.update(bench_gate(repeat, warmup))
+    if "startup" in suites:
+        results.update(bench_startup(repeat))
+    if "micro" in suites:
+        results.update(bench_micro(cells, repeat, warmup))
+    if "macro" in suites:
+        results.update(bench_macro(cells, repeat, warmup))
+
+    print_results(results)
+    differences = []
+    if "check" in suites:
+        differences = check_csd(CHECK_CASES)
+        for difference in differences:
+            print("DIFFERENCE", difference)
+        print("CSd check: %d differences" % len(differences))
+    if json_filename is not None:
+        with open(json_filename, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+    if save_baseline_filename is not None:
+        with open(save_baseline_filename, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+    if baseline_filename is not None:
+        with open(baseline_filename) as f:
+            baseline = json.load(f)
+        for change in throughput_changes(results, baseline["results"]):
+            print("THROUGHPUT", change)
+        regressions = compare_to_baseline(results, baseline["results"], tolerance, successTolerance, opsTolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            return 1
+        print("no regression against %s" % baseline_filename)
+    return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,44 @@
+import concurrent.futures
+import hashlib
+import math
 import os
 import random
 import pickle
+import shutil
+import statistics
 import sys
-import timeit
-import matplotlib.pyplot as plt
-import pandas as pd
-
-NOT_FOUND = "not found"
+import time
+import zipfile
+import numpy as np
+from corpusFormat import TestCaseOutput, convertPickledTestCases, isCorpusFile, openCorpus, writeTestCases
+from corpusGenerator import GeneratedCorpus, writeGeneratedCell
+from encodedInstance import EncodedInstance, UNDECIDED, asEncodedInstance, inferAlphabet
+from fixedParameterSearch import NOT_FOUND, CSdStats, searchCSd
+from randomSource import asRandom, drawSeed
+from hammingKernel import distancesOneToMany
+from restartEngine import RestartResult, RestartTables, runTrajectoryBatch
+from sweepJournal import ResultsTable, SweepJournal, atomic_output
+from sweepProfiler import CellProfiler, mergeProfiles, removeParts
+from wfcStructures import DistanceTracker, LetterCounts, Scoreboard, WFCStats
+
+# compute distances of encoded instances with the bit-parallel Hamming kernel
+USE_BIT_PARALLEL_DISTANCE = True
+# largest number of WFC-CSP trajectories run together by solveWithRestarts
+RESTART_BATCH_SIZE = 64
+# columns of the comparison results, the WFC columns are only filled for
+# WFC-CSP, the CSd columns only for FP
+WFC_STATS_COLUMNS = ["WFC Trajectories", "WFC Retries", "WFC Positions Decided", "WFC Scoreboard Scans",
+                     "WFC Distance Updates", "WFC Tie Break Draws", "WFC Distance Recomputes", "WFC Table Builds"]
+CSD_STATS_COLUMNS = ["CSd Nodes", "CSd Max Depth", "CSd Avg Depth", "CSd D0 Prunes", "CSd D1 Prunes",
+                     "CSd D3 Branching", "CSd Distance Time"]
+# per case time distribution and mean time split of the comparison results,
+# "Time" is the mean solver time per case; "Solve Time" and "Retry Time" are
+# only filled for WFC-CSP, "CPU Time" only if TEST_CONFIGURATION['cpuTime']
+TIME_COLUMNS = ["Time Median", "Time P95", "Time Max", "Solve Time", "Retry Time", "Bookkeeping Time", "CPU Time"]
+RESULT_COLUMNS = ["Algorithm", "Alphabet Size", "k", "d", "L", "Time"] + TIME_COLUMNS + \
+                 WFC_STATS_COLUMNS + CSD_STATS_COLUMNS + \
+                 ["Total", "Failed", "Saved", "Average Max Solution Distance/d", "Average Max Solution Distance",
+                  "Average Avg Solution Distance", "Success Rate"]
 ALPHABET_4 = ["a", "b", "c", "d"]
 ALPHABET_20 = ["a", "b", "c", "d", "e", "f", "g", "h", "i", "j", "k", "l", "m", "n", "o", "p", "q", "r", "s", "t"]
 TEST_CONFIGURATION = {
@@ -27,7 +59,31 @@ TEST_CONFIGURATION = {
     'totalCases': 1000,
 
     # maxTries
-    'maxTries': 1000
+    'maxTries': 1000,
+
+    # base random seed, the test cases of every sweep cell are generated
+    # and every test case is run with its own seed derived from it
+    'seed': 0,
+
+    # also run the fixed parameter (CSd) algorithm, for cells with d up to
+    # fixedParameterMaxD
+    'fixedParameter': False,
+    'fixedParameterMaxD': 20,
+
+    # generate the test cases of generate_comparison_data when they are run,
+    # from the seed, instead of reading the files of generate_comparison_testcases
+    'generateTestCases': False,
+
+    # write the ant instance files of each sweep cell to one zip archive
+    # "<cell>_ant.zip" instead of a "<cell>_ant" directory
+    'antArchive': False,
+
+    # also measure the process CPU time of every solve
+    'cpuTime': False,
+
+    # seconds after which compare_algorithms starts no more batches of
+    # retries of a test case, None to only stop at maxTries
+    'compareTimeLimit': 0.01
 }
 
 
@@ -92,6 +148,11 @@ def calculateLetterFreq(inputStrings, alphabet):
     :param alphabet: alphabet used to create the input strings
     """
 
+    if isinstance(inputStrings, EncodedInstance):
+        # same tables, keyed by letter code instead of letter
+        letterCounts = LetterCounts(inputStrings)
+        return letterCounts.freqTable(), letterCounts.positionTable()
+
     # find string length from the first string
     stringLength = len(inputStrings[0])
 
@@ -134,6 +195,9 @@ def calculateDistance(string1, string2):
     :return:
     """
 
+    if isinstance(string1, np.ndarray) and isinstance(string2, np.ndarray):
+        return int(np.count_nonzero(string1 != string2))
+
     distance = 0
     stringLength = len(string1)
     for index in range(stringLength):
@@ -143,7 +207,25 @@ def calculateDistance(string1, string2):
     return distance
 
 
+def calculateEncodedDistances(string, instance):
+    """
+    :param string: uint8 array of letter codes
+    :param instance: EncodedInstance
+    :return: int array of the Hamming distances between string and every
+             input string of instance
+    """
+    if USE_BIT_PARALLEL_DISTANCE:
+        return distancesOneToMany(string, instance.bitPlanes())
+    return np.count_nonzero(instance.matrix != string, axis=1)
+
+
 def calculateDistancesWithInputStrings(answer, inputStrings):
+    if isinstance(inputStrings, EncodedInstance):
+        encodedDistances = calculateEncodedDistances(answer, inputStrings)
+        distances = [[index, distance] for index, distance in enumerate(encodedDistances.tolist())]
+        distances.sort(key=lambda entry: entry[1], reverse=True)
+        return distances
+
     distances = []
     for inputStringIndex in range(len(inputStrings)):
         distance = calculateDistance(answer, inputStrings[inputStringIndex])
@@ -154,6 +236,14 @@ def calculateDistancesWithInputStrings(answer, inputStrings):
 
 
 def updateInputStringsDistances(inputStringDistances, answer, inputStrings, updatedPosition):
+    if isinstance(inputStrings, EncodedInstance):
+        matches = (inputStrings.matrix[:, updatedPosition] == answer[updatedPosition]).tolist()
+        for entry in inputStringDistances:
+            if matches[entry[0]]:
+                entry[1] -= 1
+        inputStringDistances.sort(key=lambda entry: entry[1], reverse=True)
+        return
+
     for index in range(len(inputStringDistances)):
         inputStringIndex = inputStringDistances[index][0]
         if inputStrings[inputStringIndex][updatedPosition] == answer[updatedPosition]:
@@ -164,17 +254,17 @@ def updateInputStringsDistances(inputStringDistances, answer, inputStrings, upda
     inputStringDistances.sort(key=lambda entry: entry[1], reverse=True)
 
 
-def getMaxDistStr(strDistArray):
+def getMaxDistStr(strDistArray, rng=None):
     maxDist = strDistArray[0][1]
     count = 0
     for string, distance in strDistArray:
         if distance == maxDist:
             count += 1
-    pick = random.randrange(count)
+    pick = asRandom(rng).randrange(count)
     return strDistArray[pick]
 
 
-def findMaxLetters(maxDistanceInputString, scoreboard):
+def findMaxLetters(maxDistanceInputString, scoreboard, rng=None):
     maxLetters = []
     for position, letter, score in scoreboard:
         if maxDistanceInputString[position] == letter:
@@ -188,65 +278,303 @@ def findMaxLetters(maxDistanceInputString, scoreboard):
     for letter in maxLetters:
         if letter[2] == maxDist:
             maxDistLetters.append(letter)
-    return random.choice(maxDistLetters)
-
+    return asRandom(rng).choice(maxDistLetters)
+
+
+class ClosestStringRun(object):
+    def __init__(self, answer, distances, depth):
+        """
+        :param answer: uint8 letter codes of the answer, or NOT_FOUND if the
+                       run was aborted
+        :param distances: int array of the Hamming distances between answer
+                          and the input strings, None if the run was aborted
+        :param depth: number of positions decided by the greedy steps before
+                      the run finished or aborted
+        """
+        self.answer = answer
+        self.distances = distances
+        self.depth = depth
+
+    @property
+    def aborted(self):
+        return self.answer is NOT_FOUND
+
+
+def runClosestString(instance, maximumDistance, letterCounts=None, earlyAbort=False, rng=None, stats=None,
+                     spans=None):
+    """
+    one WFC-CSP run on an encoded instance
+    :param instance: EncodedInstance
+    :param maximumDistance: maximum Hamming distance allowed
+    :param letterCounts: LetterCounts of instance, computed if not given
+    :param earlyAbort: stop with NOT_FOUND as soon as the run provably ends
+                       with some string farther than maximumDistance. Failure
+                       only becomes certain at the zero-slack collapse: the run
+                       aborts there if two zero-slack strings conflict, or
+                       after the completion if it leaves a string too far. No
+                       string exceeds maximumDistance before the collapse, so
+                       runs abort late, e.g. at depth 18-19 of L=20
+    :param rng: random source of the run (random.Random or int seed), the
+                module level random if None
+    :param stats: optional WFCStats collector
+    :param spans: optional SpanTimers, timed phases are "freq table",
+                  "scoreboard", "pick", "update" and "completion"
+    :return: ClosestStringRun
+    """
+    rng = asRandom(rng)
+    if stats is not None:
+        stats.trajectories += 1
 
-def findClosestString(alphabet, inputStrings, maximumDistance):
     # all string are of same length
-    stringLength = len(inputStrings[0])
-
-    letterFreqTable, letterPositionTable = calculateLetterFreq(inputStrings, alphabet)
+    stringLength = instance.stringLength
+
+    if spans is not None:
+        spanStart = time.perf_counter_ns()
+    if letterCounts is None:
+        letterCounts = LetterCounts(instance, stats)
+        if spans is not None:
+            spanEnd = time.perf_counter_ns()
+            spans.add("freq table", spanEnd - spanStart)
+            spanStart = spanEnd
+    scoreboard = Scoreboard(letterCounts, instance, rng, stats)
+    if spans is not None:
+        spans.add("scoreboard", time.perf_counter_ns() - spanStart)
+
+    # create initial answer with all UNDECIDED, every input string is at
+    # distance stringLength
+    answer = np.full(stringLength, UNDECIDED, dtype=np.uint8)
+    undecidedCount = stringLength
+    inputStringDistances = DistanceTracker([stringLength] * instance.numStrings, rng)
+
+    while undecidedCount > 0:
+        if spans is not None:
+            spanStart = time.perf_counter_ns()
+        # slack of the string with maximum distance: how many more of the
+        # undecided positions it can still mismatch and stay within
+        # maximumDistance; every other string has at least as much slack.
+        # It starts at maximumDistance and drops by at most 1 per step, so
+        # the run collapses at 0 before it can become negative
+        slack = maximumDistance + undecidedCount - inputStringDistances.maxDistance
+        if slack == 0:
+            # collapse: every undecided position is forced to agree with a
+            # string that has no slack left
+            zeroSlackStrings = inputStringDistances.buckets[inputStringDistances.maxDistance]
+            completion = instance[rng.choice(zeroSlackStrings)]
+            if stats is not None:
+                stats.tieBreakDraws += 1
+            undecided = answer == UNDECIDED
+            if earlyAbort and len(zeroSlackStrings) > 1:
+                # contradiction: two strings without slack that disagree at
+                # an undecided position cannot both be matched there, the
+                # run fails without writing out the completion
+                if (instance.matrix[zeroSlackStrings][:, undecided] != completion[undecided]).any():
+                    return ClosestStringRun(NOT_FOUND, None, stringLength - undecidedCount)
+            answer[undecided] = completion[undecided]
+            distances = calculateEncodedDistances(answer, instance)
+            if stats is not None:
+                stats.distanceRecomputes += 1
+            if spans is not None:
+                spans.add("completion", time.perf_counter_ns() - spanStart)
+            if earlyAbort and distances.max() > maximumDistance:
+                return ClosestStringRun(NOT_FOUND, None, stringLength - undecidedCount)
+            return ClosestStringRun(answer, distances, stringLength - undecidedCount)
+
+        # pick a string with maximum distance to the answer
+        maxDistanceInputStringIndex, maxDistance = inputStringDistances.getMaxDistStr()
+
+        # find the best scoring undecided (position, letter) that matches
+        # maxDistanceInputString
+        maxLetter = scoreboard.findMaxLetter(maxDistanceInputStringIndex)
+        answer[maxLetter[0]] = maxLetter[1]
+        if spans is not None:
+            spanEnd = time.perf_counter_ns()
+            spans.add("pick", spanEnd - spanStart)
+            spanStart = spanEnd
 
-    # create initial answer with all SPACE
-    answer = [" "] * stringLength
-    undecidedPositions = set(range(stringLength))
+        # remove position from undecided positions and from the scoreboard
+        undecidedCount -= 1
+        scoreboard.remove(maxLetter[0])
 
-    # sort and find string with maximum distance to current answer
-    inputStringDistances = calculateDistancesWithInputStrings(answer,
-                                                              inputStrings)
+        # update
+        matchingStrings = letterCounts.stringsWithLetter(maxLetter[0], maxLetter[1]).tolist()
+        inputStringDistances.update(matchingStrings)
+        if spans is not None:
+            spans.add("update", time.perf_counter_ns() - spanStart)
 
-    while True:
-        # there is at least 1 undecided positions
-        scoreboard = calculateScoreboard(letterFreqTable, undecidedPositions)
+        if stats is not None:
+            stats.positionsDecided += 1
+            # one draw picks the string, one the position
+            stats.tieBreakDraws += 2
+            stats.distanceUpdates += len(matchingStrings)
 
-        # first string is the one with maximum distance to the answer
-        maxDistanceInputStringIndex, maxDistance = getMaxDistStr(inputStringDistances)
-        maxDistanceInputString = inputStrings[maxDistanceInputStringIndex]
-        #print("current string with maximum Distance: ", maxDistanceInputString, maxDistance)
+    # all position decided by greedy steps, the tracked distances are exact
+    return ClosestStringRun(answer, np.array(inputStringDistances.distances), stringLength)
 
-        # find the 1st (position, letter) in scoreboard  that matches
-        # maxDistanceInputString
 
-        maxLetter = findMaxLetters(maxDistanceInputString, scoreboard)
-        answer[maxLetter[0]] = maxLetter[1]
+def findClosestString(alphabet, inputStrings, maximumDistance, letterCounts=None, earlyAbort=False, rng=None,
+                      stats=None, spans=None, returnDepth=False):
+    """
+    :param alphabet: alphabet used to create the input strings
+    :param inputStrings: EncodedInstance or list of input strings
+    :param maximumDistance: maximum Hamming distance allowed
+    :param letterCounts: LetterCounts of inputStrings, computed if not given
+    :param earlyAbort: return NOT_FOUND as soon as the answer provably has
+                       some string farther than maximumDistance
+    :param rng: random source (random.Random or int seed), the module level
+                random if None
+    :param stats: optional WFCStats collector
+    :param spans: optional SpanTimers of the phases of the run
+    :param returnDepth: also return the depth of the run, the number of
+                        positions decided by greedy steps before it finished
+                        or aborted
+    :return: answer as uint8 letter codes for an EncodedInstance, as list of
+             letters for list input strings, or NOT_FOUND; (answer, depth)
+             if returnDepth
+    """
+    if not isinstance(inputStrings, EncodedInstance):
+        # list input: solve the encoded instance and decode the answer
+        instance = asEncodedInstance(inputStrings, alphabet)
+        answer, depth = findClosestString(alphabet, instance, maximumDistance, earlyAbort=earlyAbort, rng=rng,
+                                          stats=stats, spans=spans, returnDepth=True)
+        if answer is not NOT_FOUND:
+            answer = instance.codec.decode(answer)
+        return (answer, depth) if returnDepth else answer
 
-        # remove position from undecided positions
-        undecidedPositions.remove(maxLetter[0])
+    run = runClosestString(inputStrings, maximumDistance, letterCounts, earlyAbort, rng, stats, spans)
+    return (run.answer, run.depth) if returnDepth else run.answer
 
-        # update
-        if len(undecidedPositions) > 0:
-            updateInputStringsDistances(inputStringDistances, answer, inputStrings, maxLetter[0])
-        else:
-            # all position decided
-            break
-
-    return answer
 
+def checkTestCase(numStrings, inputStrings, answer, alphabet, k, earlyAbort=False, rng=None, stats=None,
+                  returnDepth=False):
+    """
+    :param inputStrings: EncodedInstance or list of input strings
+    :param earlyAbort: stop the run as soon as it provably fails (see
+                       runClosestString), the solution of a failed case is
+                       then NOT_FOUND
+    :param rng: random source (random.Random or int seed), the module level
+                random if None
+    :param stats: optional WFCStats collector
+    :param returnDepth: also return the depth of the run, the abort depth of
+                        an aborted run
+    :return: (True if the solution is within distance k, solution in the same
+             form as inputStrings), plus the depth if returnDepth
+    """
+    instance = asEncodedInstance(inputStrings, alphabet)
 
-def checkTestCase(numStrings, inputStrings, answer, alphabet, k):
+    run = runClosestString(instance, k, earlyAbort=earlyAbort, rng=rng, stats=stats)
+    if run.aborted:
+        success, result = False, NOT_FOUND
+    else:
+        result = run.answer
+        if instance is not inputStrings:
+            result = instance.codec.decode(result)
+        success = bool(run.distances.max() <= k)
 
-    letterFreqTable, letterPositionTable = calculateLetterFreq(inputStrings, alphabet)
+    if returnDepth:
+        return success, result, run.depth
+    return success, result
 
-    result = findClosestString(alphabet, inputStrings, k)
 
-    inputStringDistances = calculateDistancesWithInputStrings(result, inputStrings)
+def solveWithRestarts(instance, k, maxTries, timeLimit=None, batchSize=RESTART_BATCH_SIZE, rng=None, stats=None,
+                      spans=None):
+    """
+    Run randomized WFC-CSP trajectories of one instance until one is within
+    distance k. The first trajectory is a regular findClosestString run, the
+    retries run in batches of growing size that share the instance tables.
+    The run and every batch get their own seed drawn from rng, the result
+    records the one that found the answer so it can be replayed with
+    replayRestart.
+
+    :param instance: EncodedInstance
+    :param k: maximum Hamming distance allowed
+    :param maxTries: maximum number of trajectories
+    :param timeLimit: stop starting new batches after timeLimit seconds
+    :param batchSize: largest number of trajectories run at once
+    :param rng: random source (random.Random or int seed), the module level
+                random if None
+    :param stats: optional WFCStats collector
+    :param spans: optional SpanTimers, the phases of the first run and the
+                  "retry batch" phase of every batch of retries
+    :return: RestartResult of the first success, or of the best failure,
+             with the time of the first run and of the retries
+    """
+    rng = asRandom(rng)
+    if stats is not None:
+        stats.solves += 1
+    startTime = time.perf_counter_ns()
+    letterCounts = LetterCounts(instance, stats)
+    if spans is not None:
+        spans.add("freq table", time.perf_counter_ns() - startTime)
+    seed = drawSeed(rng)
+    run = runClosestString(instance, k, letterCounts, rng=random.Random(seed), stats=stats, spans=spans)
+    maxDistance = int(run.distances.max())
+    tries = 1
+    best = RestartResult(maxDistance <= k, run.answer, tries, maxDistance, seed)
+    retryStartTime = time.perf_counter_ns()
+    solveTime = retryStartTime - startTime
+    if best.success:
+        best.solveTime = solveTime
+        return best
+
+    tables = RestartTables(instance, letterCounts, stats)
+    numTrajectories = 1
+    while tries < maxTries:
+        if timeLimit is not None and time.perf_counter_ns() - retryStartTime > timeLimit * 1e9:
+            break
 
-    if inputStringDistances[0][1] > k:
-        return False, result
-    return True, result
+        numTrajectories = min(2 * numTrajectories, batchSize, maxTries - tries)
+        seed = drawSeed(rng)
+        if spans is not None:
+            spanStart = time.perf_counter_ns()
+        answers, distances = runTrajectoryBatch(tables, numTrajectories, k, np.random.default_rng(seed), stats)
+        if spans is not None:
+            spans.add("retry batch", time.perf_counter_ns() - spanStart)
+        maxDistances = distances.max(axis=1)
+
+        successes = np.flatnonzero(maxDistances <= k)
+        if len(successes) > 0:
+            first = int(successes[0])
+            if stats is not None:
+                # retries up to the first success, the trajectories run
+                # after it in the batch only count as trajectories
+                stats.retries += tries + first
+            result = RestartResult(True, answers[first], tries + first + 1, int(maxDistances[first]),
+                                   seed, numTrajectories, first)
+            result.solveTime = solveTime
+            result.retryTime = time.perf_counter_ns() - retryStartTime
+            return result
+
+        tries += numTrajectories
+        bestTrajectory = int(np.argmin(maxDistances))
+        if maxDistances[bestTrajectory] < best.maxDistance:
+            best = RestartResult(False, answers[bestTrajectory], tries, int(maxDistances[bestTrajectory]),
+                                 seed, numTrajectories, bestTrajectory)
+
+    if stats is not None:
+        stats.retries += tries - 1
+    best.tries = tries
+    best.solveTime = solveTime
+    best.retryTime = time.perf_counter_ns() - retryStartTime
+    return best
+
+
+def replayRestart(instance, k, seed, batchSize=0, trajectory=0):
+    """
+    rerun one trajectory of solveWithRestarts
+    :param seed: seed of the RestartResult
+    :param batchSize: batch size of the RestartResult, 0 for the first run
+    :param trajectory: trajectory of the RestartResult
+    :return: uint8 letter codes of the answer of the trajectory
+    """
+    letterCounts = LetterCounts(instance)
+    if batchSize == 0:
+        return runClosestString(instance, k, letterCounts, rng=random.Random(seed)).answer
+    tables = RestartTables(instance, letterCounts)
+    answers, distances = runTrajectoryBatch(tables, batchSize, k, np.random.default_rng(seed))
+    return answers[trajectory]
 
 
-class ClosestStringTestCase(object):
+class ClosestStringTestCase(TestCaseOutput):
     def __init__(self, alphabet, numStrings, stringLength, maxDistance):
         self.alphabet = alphabet
         self.numStrings = numStrings
@@ -259,102 +587,45 @@ class ClosestStringTestCase(object):
     def save(self, filename):
         pickle.dump(self, open(filename, "wb"))
 
+    def encoded(self):
+        """
+        :return: input strings as EncodedInstance
+        """
+        return asEncodedInstance(self.inputStrings, self.alphabet)
+
     @staticmethod
     def load(filename):
         return pickle.load(open(filename, "rb"))
 
-    def print(self):
-        print("CloseStringTestCase:")
-        print("    alphabet", self.alphabet)
-        print("    numStrings", self.numStrings)
-        print("    stringLength", self.stringLength)
-        print("    maxDistance", self.maxDistance)
-        print("    answer: ", self.answer)
-        print("    inputStrings: ", self.inputStrings)
-
-    def save_to_ant_instance_file(self, filename):
-        f = open(filename, "w")
-
-        # Alphabet size
-        print(len(self.alphabet), file=f)
-
-        # number of strings
-        print(self.numStrings, file=f)
-
-        # string length
-        print(self.stringLength, file=f)
-
-        # alphabet
-        print(" ".join(self.alphabet), file=f)
-
-        for s in self.inputStrings:
-            print("".join(s), file=f)
-
-        f.close()
-
 
-def CSd(S, d, s, deltaD):
+def CSd(S, d, s, deltaD, stats=None, rng=None):
     """
     :param S:   global variable, set of input strings
     :param d:   global variable, integer d
     :param s:   candidate string s
     :param deltaD:  integer detalD
+    :param stats:   optional CSdStats collector
+    :param rng:     random source (random.Random or int seed), the module
+                    level random if None
     :return:    result string or NOT_FOUND
     """
 
-    # print("CSd s: ", s, "deltaD: ", deltaD)
-    # D0
-    if deltaD < 0:
-        # print("     D0: ", NOT_FOUND)
-        return NOT_FOUND
-
-    # D1
-    for i in range(len(S)):
-        if calculateDistance(s, S[i]) > d + deltaD:
-            # print("     D1: ", NOT_FOUND)
+    if not isinstance(S, EncodedInstance):
+        # list input: search on the encoded instance and decode the answer;
+        # s may hold letters that are in none of the input strings
+        instance = asEncodedInstance(S, inferAlphabet(list(S) + [s]))
+        sRet = CSd(instance, d, instance.codec.encode(s), deltaD, stats, rng)
+        if sRet is NOT_FOUND:
             return NOT_FOUND
-    # D2
-    sWorks = True
-    for i in range(len(S)):
-        if calculateDistance(s, S[i]) > d:
-            sWorks = False
-    if sWorks:
-        # print("     D2 found: ", s)
-        return s
-
-    # D3
-    inputStringDistances = calculateDistancesWithInputStrings(s, S)
-    # find all stringIndex that Dh(s, si) > d:
-    allSiIndex = []
-    for stringIndex, distance in inputStringDistances:
-        if distance > d:
-            allSiIndex.append(stringIndex)
-
-    # randomly pick some i from allSiIndex
-    i = random.choice(allSiIndex)
-    si = S[i]
-    # print("     D3 si: ", si)
-
-    # find P
-    P = []
-    for p in range(len(s)):
-        if s[p] != si[p]:
-            P.append(p)
-    # print("     D3 P: ", P)
-
-    # randomly choose d+1 from P
-    PPrime = random.sample(P, d+1)
-    # print("     D3 P': ", PPrime)
-
-    for p in PPrime:
-        sPrime = s.copy()
-        sPrime[p] = si[p]
-        sRet = CSd(S, d, sPrime, deltaD-1)
-        if sRet != NOT_FOUND:
-            # print("     D3 found: ", sRet)
-            return sRet
-    # print("      not found: ")
-    return NOT_FOUND
+        return instance.codec.decode(sRet)
+
+    # distances between s and all input strings are computed once, the
+    # search updates them as it changes single positions of s
+    distanceStartTime = time.perf_counter_ns()
+    distances = calculateEncodedDistances(s, S)
+    if stats is not None:
+        stats.distanceTime += (time.perf_counter_ns() - distanceStartTime) / 1e9
+    return searchCSd(S, d, s, deltaD, distances, stats, rng)
 
 
 def create_working_testcases(alphabet, numStrings, stringLength, k, count):
@@ -367,7 +638,7 @@ def create_working_testcases(alphabet, numStrings, stringLength, k, count):
 
 
 def save_testcases_to_file(testcases, filename):
-    pickle.dump(testcases, open(filename, "wb"))
+    writeTestCases(filename, testcases)
 
 
 def save_testcases_to_ant_instance_files(testcases, filename):
@@ -375,11 +646,74 @@ def save_testcases_to_ant_instance_files(testcases, filename):
         testcases[i].save_to_ant_instance_file("%s_%d" % (filename, i))
 
 
+def save_testcases_to_ant_archive(testcases, archive_filename, filename):
+    """
+    write the ant instance files of testcases as members "<filename>_<i>" of
+    one zip archive instead of one file each; the archive is written member
+    by member and its central directory is the index of the members
+    """
+    with atomic_output(archive_filename) as tempFilename:
+        with zipfile.ZipFile(tempFilename, "w", zipfile.ZIP_DEFLATED) as archive:
+            for i in range(len(testcases)):
+                archive.writestr("%s_%d" % (filename, i), testcases[i].to_ant_instance_text())
+
+
+def extract_ant_archive(archive_filename, directory, members=None):
+    """
+    extract ant instance files from an archive of save_testcases_to_ant_archive
+    one member at a time
+    :param directory: directory to write the ant instance files to
+    :param members: names of the members to extract, all if None
+    :return: list of the extracted files
+    """
+    extracted = []
+    with zipfile.ZipFile(archive_filename) as archive:
+        if members is None:
+            members = archive.namelist()
+        for member in members:
+            # members are flat file names, never paths
+            extracted_filename = os.path.join(directory, os.path.basename(member))
+            with archive.open(member) as src, open(extracted_filename, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            extracted.append(extracted_filename)
+    return extracted
+
+
 def load_testcases_from_file(filename):
+    """
+    :return: read-only memory-mapped Corpus of a corpus file, shared by all
+             callers in this process, or the list of ClosestStringTestCase of
+             a file pickled by older versions
+    """
+    if isCorpusFile(filename):
+        return openCorpus(filename)
     return pickle.load(open(filename, "rb"))
 
 
+def convert_testcases(filename):
+    """
+    convert a pickled test case file, or all of them in a directory, to the
+    corpus format in place
+    """
+    if os.path.isdir(filename):
+        # test case files of generate_comparison_testcases have no extension
+        filenames = [os.path.join(filename, name) for name in sorted(os.listdir(filename))
+                     if "." not in name and os.path.isfile(os.path.join(filename, name))]
+    else:
+        filenames = [filename]
+    for testCase_filename in filenames:
+        if isCorpusFile(testCase_filename):
+            continue
+        with atomic_output(testCase_filename) as tempFilename:
+            convertPickledTestCases(testCase_filename, tempFilename)
+        print("converted", testCase_filename)
+
+
 def getHammingDistanceMaxAndAvg(stringParts, answerString):
+    if isinstance(stringParts, EncodedInstance):
+        distances = calculateEncodedDistances(answerString, stringParts)
+        return int(distances.max()), int(distances.sum()) / len(stringParts)
+
     maxDist = 0
     totalDist = 0
     for string in stringParts:
@@ -391,96 +725,80 @@ def getHammingDistanceMaxAndAvg(stringParts, answerString):
     return maxDist, averageDist
 
 
-def compare_algorithms(testcases):
-    closestStringAnswerDists = []
-    closestStringSolutionDists = []
-
-    fixedParameterAnswerDists = []
-    fixedParameterSolutionDists = []
-
-    numCases = 0
-    numCasesFailed = 0
-    numCasesSaved = 0
-
-    testCaseSolution = []
-
-    closestStringAlgoStartTime = timeit.default_timer()
-    closestStringAlgoSuccessCount = 0
-    for testcase in testcases:
-        testCaseResult, testCaseSolution = checkTestCase(len(testcase.inputStrings),
-                                            testcase.inputStrings,
-                                            testcase.answer,
-                                            testcase.alphabet,
-                                            testcase.maxDistance)
-        numCases += 1
-        if testCaseResult is False:
-            numCasesFailed += 1
-
-        timesToTryAgain = 0
-        caseSaveTimeStart = timeit.default_timer()
-        while testCaseResult is False:
-            caseSaveTimeStop = timeit.default_timer()
-            if (caseSaveTimeStop-caseSaveTimeStart) > 0.01:
-                break
-            random.shuffle(testcase.inputStrings)
-            testCaseResult, testCaseSolution = checkTestCase(len(testcase.inputStrings),
-                                                testcase.inputStrings,
-                                                testcase.answer,
-                                                testcase.alphabet,
-                                                testcase.maxDistance)
-            if testCaseResult:
-                numCasesSaved += 1
-                break
-            timesToTryAgain += 1
-    closestStringAlgoEndTime = timeit.default_timer()
-
-    fixedParameterAlgoStartTime = timeit.default_timer()
-    fixedParameterAlgoSuccessCount = 0
-    numCases = 0
-    for testcase in testcases:
-        numCases += 1
-        fixedParameterAlgoSolution = CSd(testcase.inputStrings,
-                                       testcase.maxDistance,
-                                       testcase.inputStrings[0],
-                                       testcase.maxDistance)
-        if fixedParameterAlgoSolution != NOT_FOUND:
-            fixedParameterAlgoSuccessCount += 1
-    fixedParameterAlgoEndTime = timeit.default_timer()
-    print("closestStringAnswerDists:", closestStringAnswerDists)
-    print("closestStringSolutionDists:", closestStringSolutionDists)
-    print("Closest String Algorithm Execute Time (%d tests)" % len(testcases),
-          closestStringAlgoEndTime - closestStringAlgoStartTime)
-    print("Out of", len(testcases), "test cases", numCasesFailed, "cases failed.")
-    print("Saved cases: ", numCasesSaved)
+def compare_algorithms(testcases, profile_dir=None):
+    """
+    :param profile_dir: if given, write the cProfile stats, the sampled
+                        stacks and the solver phase timers of the comparison
+                        to profile_compare.* in this directory
+    """
+    if profile_dir is not None:
+        os.makedirs(profile_dir, exist_ok=True)
+        prefix = os.path.join(profile_dir, "profile_compare")
+        with CellProfiler(prefix + ".part0") as profiler:
+            run_compare_algorithms(testcases, profiler.spans)
+        mergeProfiles([prefix + ".part0"], prefix)
+    else:
+        run_compare_algorithms(testcases)
+
+
+def run_compare_algorithms(testcases, spans=None):
+    """
+    run both algorithms on testcases, every case with its own seed as in
+    generate_comparison_data, and print the results
+    """
+    seed = TEST_CONFIGURATION['seed']
+    cpuTime = TEST_CONFIGURATION['cpuTime']
+    alphabet = testcases[0].alphabet
+    cell = (testcases[0].numStrings, testcases[0].maxDistance, testcases[0].stringLength)
+
+    wfcRecords = []
+    for caseIndex, testcase in enumerate(testcases):
+        wfcRecords.append(run_wfc_case(testcase, TEST_CONFIGURATION['maxTries'],
+                                       case_seed(seed, "WFC-CSP", *cell, caseIndex), spans, cpuTime,
+                                       TEST_CONFIGURATION['compareTimeLimit']))
+
+    fpRecords = []
+    for caseIndex, testcase in enumerate(testcases):
+        fpRecords.append(run_fp_case(testcase, case_seed(seed, "FP", *cell, caseIndex), cpuTime))
+
+    result = summarize_wfc_cell(alphabet, cell, wfcRecords)
+    print("Closest String Algorithm Execute Time (%d tests)" % len(testcases), result["Time"] * len(testcases))
+    print_time_distribution(result)
+    print("Out of", len(testcases), "test cases", result["Failed"], "cases failed.")
+    print("Saved cases: ", result["Saved"])
     print("-----")
-    print("fixedParameterAnswerDists:", fixedParameterAnswerDists)
-    print("fixedParameterSolutionDists:", fixedParameterSolutionDists)
-    print("Fixed Parameter Algorithm Execute Time (%d tests)" % len(testcases),
-          fixedParameterAlgoEndTime - fixedParameterAlgoStartTime)
+    result = summarize_fp_cell(alphabet, cell, fpRecords)
+    fixedParameterStats = CSdStats()
+    for record in fpRecords:
+        fixedParameterStats.merge(CSdStats.fromState(record["CSd State"]))
+    print("Fixed Parameter Algorithm Execute Time (%d tests)" % len(testcases), result["Time"] * len(testcases))
+    print_time_distribution(result)
+    print("Fixed Parameter Algorithm search stats:", fixedParameterStats.asDict())
+    print("Fixed Parameter Algorithm depth histogram:", sorted(fixedParameterStats.depthHistogram.items()))
+
+
+def print_time_distribution(result):
+    """
+    print the per case time distribution and time split of a cell result
+    """
+    print("Time per case: mean %f, median %f, p95 %f, max %f" %
+          (result["Time"], result["Time Median"], result["Time P95"], result["Time Max"]))
+    print("Mean time split:", ", ".join("%s %f" % (column, result[column])
+                                       for column in ["Solve Time", "Retry Time", "Bookkeeping Time", "CPU Time"]
+                                       if column in result))
 
 
 def compare_closest_algorithm_with_ant(testcases):
+    import pandas as pd
+
     results = []
     totalHammingDistance = 0
     for i in range(len(testcases)):
         testcase = testcases[i]
-        testCaseResult, testCaseSolution = checkTestCase(len(testcase.inputStrings),
-                                                         testcase.inputStrings,
-                                                         testcase.answer,
-                                                         testcase.alphabet,
-                                                         testcase.maxDistance)
-        timesToTryAgain = 0
-        while testCaseResult is False and timesToTryAgain < 199:
-            random.shuffle(testcase.inputStrings)
-            testCaseResult, testCaseSolution = checkTestCase(
-                len(testcase.inputStrings),
-                testcase.inputStrings,
-                testcase.answer,
-                testcase.alphabet,
-                testcase.maxDistance)
-            timesToTryAgain += 1
-
-        solutionDist, avgDist = getHammingDistanceMaxAndAvg(testcase.inputStrings, testCaseSolution)
+        instance = testcase.encoded()
+        restart = solveWithRestarts(instance, testcase.maxDistance, 200)
+
+        solutionDist, avgDist = getHammingDistanceMaxAndAvg(instance, restart.answer)
         totalHammingDistance += solutionDist
         result = dict()
         result["Testcase No."] = i
@@ -495,182 +813,551 @@ def compare_closest_algorithm_with_ant(testcases):
     df.to_excel("to_ant.xlsx", index=False)
 
 
-def generate_comparison_data(filename, excel_filename):
+def case_seed(seed, algorithm, numStrings, ham, s, caseIndex):
+    """
+    :return: random seed of one test case of a sweep cell, the same in every
+             process so serial and parallel sweeps give identical results
+    """
+    key = "%s_%s_%d_%d_%d_%d" % (seed, algorithm, numStrings, ham, s, caseIndex)
+    return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "little")
+
+
+def run_wfc_case(testCase, maxTries, seed, spans=None, cpuTime=False, timeLimit=None):
+    """
+    "Time" is the time of solveWithRestarts only, split in the "Solve Time"
+    of the first trajectory and the "Retry Time" of the retries; encoding the
+    test case and checking the answer are "Bookkeeping Time"
+    :param spans: optional SpanTimers of the phases of the solver
+    :param cpuTime: also record the process "CPU Time" of the solve
+    :param timeLimit: time limit of the retries of solveWithRestarts
+    :return: per case record of the WFC-CSP algorithm, times in seconds
+    """
+    caseStats = WFCStats()
+    caseStartTime = time.perf_counter_ns()
+    instance = testCase.encoded()
+    rng = random.Random(seed)
+    if cpuTime:
+        cpuStartTime = time.process_time_ns()
+    solveStartTime = time.perf_counter_ns()
+    restart = solveWithRestarts(instance, testCase.maxDistance, maxTries, timeLimit, rng=rng, stats=caseStats,
+                                spans=spans)
+    solveEndTime = time.perf_counter_ns()
+    if cpuTime:
+        cpuEndTime = time.process_time_ns()
+    maxSolutionDist, avgDist = getHammingDistanceMaxAndAvg(instance, restart.answer)
+
+    testCaseStat = dict()
+    testCaseStat["Tries"] = int(restart.tries)
+    testCaseStat["Success"] = bool(restart.success)
+    testCaseStat["Time"] = (solveEndTime - solveStartTime) / 1e9
+    testCaseStat["Solve Time"] = restart.solveTime / 1e9
+    testCaseStat["Retry Time"] = restart.retryTime / 1e9
+    if cpuTime:
+        testCaseStat["CPU Time"] = (cpuEndTime - cpuStartTime) / 1e9
+    testCaseStat["Max Solution Distance"] = maxSolutionDist
+    testCaseStat["Avg Solution Distance"] = avgDist
+    # replayRestart(instance, maxDistance, seed, batch size, trajectory)
+    # reruns the trajectory of the answer
+    testCaseStat["Try Seed"] = restart.seed
+    testCaseStat["Try Batch Size"] = restart.batchSize
+    testCaseStat["Try Trajectory"] = restart.trajectory
+    testCaseStat.update(caseStats.asDict())
+    testCaseStat["WFC State"] = caseStats.toState()
+    testCaseStat["Bookkeeping Time"] = (time.perf_counter_ns() - caseStartTime) / 1e9 - testCaseStat["Time"]
+    return testCaseStat
+
+
+def run_fp_case(testCase, seed, cpuTime=False):
+    """
+    "Time" is the time of CSd only, encoding the test case and checking the
+    answer are "Bookkeeping Time"
+    :param cpuTime: also record the process "CPU Time" of the search
+    :return: per case record of the fixed parameter (CSd) algorithm, times
+             in seconds
+    """
+    caseStats = CSdStats()
+    caseStartTime = time.perf_counter_ns()
+    instance = testCase.encoded()
+    rng = random.Random(seed)
+    if cpuTime:
+        cpuStartTime = time.process_time_ns()
+    solveStartTime = time.perf_counter_ns()
+    fixedParameterAlgoSolution = CSd(instance,
+                                     testCase.maxDistance,
+                                     instance[0],
+                                     testCase.maxDistance,
+                                     caseStats,
+                                     rng)
+    solveEndTime = time.perf_counter_ns()
+    if cpuTime:
+        cpuEndTime = time.process_time_ns()
+
+    testCaseStat = dict()
+    testCaseStat["Time"] = (solveEndTime - solveStartTime) / 1e9
+    if cpuTime:
+        testCaseStat["CPU Time"] = (cpuEndTime - cpuStartTime) / 1e9
+    testCaseStat.update(caseStats.asDict())
+    testCaseStat["Found"] = fixedParameterAlgoSolution is not NOT_FOUND
+    if testCaseStat["Found"]:
+        maxSolutionDist, avgDist = getHammingDistanceMaxAndAvg(instance, fixedParameterAlgoSolution)
+        testCaseStat["Max Solution Distance"] = maxSolutionDist
+        testCaseStat["Avg Solution Distance"] = avgDist
+    testCaseStat["CSd State"] = caseStats.toState()
+    testCaseStat["Bookkeeping Time"] = (time.perf_counter_ns() - caseStartTime) / 1e9 - testCaseStat["Time"]
+    return testCaseStat
+
+
+def cell_profile_prefix(profile_dir, cell):
+    """
+    :return: name without extension of the profile files of a sweep cell
+    """
+    return os.path.join(profile_dir, "profile_%d_%d_%d" % cell)
+
+
+def chunk_profile_prefix(profile_dir, cell, caseIndexes):
+    """
+    :return: name without extension of the profile files of one chunk of
+             test cases of a sweep cell
+    """
+    return "%s.part%d" % (cell_profile_prefix(profile_dir, cell), caseIndexes[0])
+
+
+def merge_cell_profile(profile_dir, cell, chunks):
+    """
+    merge the profiles of the chunks of a sweep cell into
+    <prefix>.pstats, <prefix>.collapsed and <prefix>.spans.json
+    :param chunks: case indexes of the chunks run by this sweep, parts of
+                   other chunks on disk are not merged
+    """
+    mergeProfiles([chunk_profile_prefix(profile_dir, cell, caseIndexes) for caseIndexes in chunks if caseIndexes],
+                  cell_profile_prefix(profile_dir, cell))
+
+
+def run_comparison_chunk(testCase_filename, cell, caseIndexes, maxTries, runFixedParameter, seed, journal=None,
+                         profile_dir=None, cpu_time=False):
+    """
+    run some test cases of one sweep cell, in this or a worker process
+    :param testCase_filename: test case file of the sweep cell, or a
+                              GeneratedCorpus to generate the test cases
+    :param cell: (numStrings, ham, s) of the sweep cell
+    :param caseIndexes: indexes of the test cases to run
+    :param journal: SweepJournal to checkpoint every finished case in, only
+                    when running in the process that owns the journal
+    :param profile_dir: directory to write the profile of the chunk to,
+                        merged per cell by merge_cell_profile
+    :param cpu_time: also record the process CPU time of every case
+    :return: (WFC-CSP case records, FP case records)
+    """
+    if profile_dir is not None and caseIndexes:
+        with CellProfiler(chunk_profile_prefix(profile_dir, cell, caseIndexes)) as profiler:
+            return run_chunk_cases(testCase_filename, cell, caseIndexes, maxTries, runFixedParameter, seed,
+                                   journal, profiler.spans, cpu_time)
+    return run_chunk_cases(testCase_filename, cell, caseIndexes, maxTries, runFixedParameter, seed, journal,
+                           cpu_time=cpu_time)
+
+
+def run_chunk_cases(testCase_filename, cell, caseIndexes, maxTries, runFixedParameter, seed, journal=None,
+                    spans=None, cpu_time=False):
+    if isinstance(testCase_filename, GeneratedCorpus):
+        testCases = testCase_filename
+    else:
+        testCases = load_testcases_from_file(testCase_filename)
+    wfcRecords = []
+    fpRecords = []
+    for caseIndex in caseIndexes:
+        testCaseStat = run_wfc_case(testCases[caseIndex], maxTries,
+                                    case_seed(seed, "WFC-CSP", *cell, caseIndex), spans, cpu_time)
+        testCaseStat["Testcase No."] = caseIndex
+        wfcRecords.append(testCaseStat)
+        if journal is not None:
+            journal.record_cases("WFC-CSP", cell, [testCaseStat])
+
+        if runFixedParameter:
+            testCaseStat = run_fp_case(testCases[caseIndex],
+                                       case_seed(seed, "FP", *cell, caseIndex), cpu_time)
+            testCaseStat["Testcase No."] = caseIndex
+            fpRecords.append(testCaseStat)
+            if journal is not None:
+                journal.record_cases("FP", cell, [testCaseStat])
+    return wfcRecords, fpRecords
+
+
+def time_distribution(records):
+    """
+    :param records: per case records of one algorithm
+    :return: result columns of the distribution of the case times and the
+             mean of the parts of the case times in the records
+    """
+    times = sorted(record["Time"] for record in records)
+    result = dict()
+    result["Time"] = sum(times) / len(times)
+    result["Time Median"] = statistics.median(times)
+    # nearest rank 95th percentile
+    result["Time P95"] = times[max(0, math.ceil(0.95 * len(times)) - 1)]
+    result["Time Max"] = times[-1]
+    for column in ["Solve Time", "Retry Time", "Bookkeeping Time", "CPU Time"]:
+        values = [record[column] for record in records if column in record]
+        if values:
+            result[column] = sum(values) / len(values)
+    return result
+
+
+def summarize_wfc_cell(alphabet, cell, wfcRecords):
+    numStrings, ham, s = cell
+    totalCases = len(wfcRecords)
+    wfcStats = WFCStats()
+    for record in wfcRecords:
+        wfcStats.merge(WFCStats.fromState(record["WFC State"]))
+    # the first try failed unless the case succeeded with one try
+    numCasesFailed = sum(1 for record in wfcRecords if not (record["Success"] and record["Tries"] == 1))
+    numCasesSaved = sum(1 for record in wfcRecords if record["Success"] and record["Tries"] > 1)
+    closestStringAverageMaxSolutionDistance = sum(record["Max Solution Distance"] for record in wfcRecords) / float(totalCases * ham)
+    closestStringAverageAvgSolutionDistance = sum(record["Avg Solution Distance"] for record in wfcRecords) / float(totalCases * ham)
+
+    result = dict()
+    result["Algorithm"] = "WFC-CSP"
+    result["Alphabet Size"] = len(alphabet)
+    result["k"] = numStrings
+    result["d"] = ham
+    result["L"] = s
+    result.update(time_distribution(wfcRecords))
+    result.update(wfcStats.asDict())
+    result["Total"] = totalCases
+    result["Failed"] = numCasesFailed
+    result["Saved"] = numCasesSaved
+    result["Average Max Solution Distance/d"] = closestStringAverageMaxSolutionDistance
+    result["Average Max Solution Distance"] = closestStringAverageMaxSolutionDistance * ham
+    result["Average Avg Solution Distance"] = closestStringAverageAvgSolutionDistance
+    result["Success Rate"] = (totalCases - numCasesFailed + numCasesSaved) / totalCases
+    return result
+
+
+def summarize_fp_cell(alphabet, cell, fpRecords):
+    numStrings, ham, s = cell
+    totalCases = len(fpRecords)
+    fixedParameterStats = CSdStats()
+    for record in fpRecords:
+        fixedParameterStats.merge(CSdStats.fromState(record["CSd State"]))
+    foundRecords = [record for record in fpRecords if record["Found"]]
+    # solution distances are averaged over the cases with a solution
+    foundCases = max(len(foundRecords), 1)
+    fixedParameterAverageMaxSolutionDistance = sum(record["Max Solution Distance"] for record in foundRecords) / float(foundCases * ham)
+    fixedParameterAverageAvgSolutionDistance = sum(record["Avg Solution Distance"] for record in foundRecords) / float(foundCases * ham)
+
+    result = dict()
+    result["Algorithm"] = "FP"
+    result["Alphabet Size"] = len(alphabet)
+    result["k"] = numStrings
+    result["d"] = ham
+    result["L"] = s
+    result.update(time_distribution(fpRecords))
+    result.update(fixedParameterStats.asDict())
+    result["Total"] = totalCases
+    result["Failed"] = totalCases - len(foundRecords)
+    result["Saved"] = 0
+    result["Average Max Solution Distance/d"] = fixedParameterAverageMaxSolutionDistance
+    result["Average Max Solution Distance"] = fixedParameterAverageMaxSolutionDistance * ham
+    result["Average Avg Solution Distance"] = fixedParameterAverageAvgSolutionDistance
+    result["Success Rate"] = len(foundRecords) / totalCases
+    return result
+
+
+def results_csv_filename(excel_filename):
+    """
+    :return: name of the CSV results table written next to excel_filename
+    """
+    return os.path.splitext(excel_filename)[0] + ".csv"
+
+
+def export_comparison_excel(excel_filename, journal, cells):
+    """
+    write the results of the sweep cells in journal to one Excel workbook:
+    the cell results, the test configuration and the per case records of
+    every algorithm
+    """
+    import pandas as pd
+
+    results = []
+    cases = {"WFC-CSP": [], "FP": []}
+    for cell in cells:
+        results.extend(journal.cellResults[cell])
+        numStrings, ham, s = cell
+        for algorithm in cases:
+            for caseIndex, record in sorted(journal.cases(algorithm, cell).items()):
+                caseRecord = {"k": numStrings, "d": ham, "L": s}
+                caseRecord.update(record)
+                cases[algorithm].append(caseRecord)
+
+    caseColumns = {
+        "WFC-CSP": ["k", "d", "L", "Testcase No.", "Tries", "Success", "Time",
+                    "Solve Time", "Retry Time", "Bookkeeping Time", "CPU Time",
+                    "Max Solution Distance", "Avg Solution Distance",
+                    "Try Seed", "Try Batch Size", "Try Trajectory"] + WFC_STATS_COLUMNS,
+        "FP": ["k", "d", "L", "Testcase No.", "Time", "Bookkeeping Time", "CPU Time"] + CSD_STATS_COLUMNS +
+              ["Found", "Max Solution Distance", "Avg Solution Distance"],
+    }
+    with atomic_output(excel_filename) as tempFilename:
+        with pd.ExcelWriter(tempFilename) as excelWriter:
+            pd.DataFrame(results, columns=RESULT_COLUMNS).to_excel(excelWriter, index=False)
+            pd.DataFrame(TEST_CONFIGURATION.items()).to_excel(excelWriter, sheet_name="README", index=False)
+            for algorithm in cases:
+                if cases[algorithm]:
+                    pd.DataFrame(cases[algorithm], columns=caseColumns[algorithm]).to_excel(
+                        excelWriter, sheet_name="%s Cases" % algorithm, index=False)
+
+
+def generate_comparison_data(filename, excel_filename, jobs=1, profile_dir=None):
+    """
+    Every finished test case and sweep cell is checkpointed in a journal
+    next to the Excel file; rerunning with the same arguments skips the
+    completed cells and resumes partially completed ones. The cell results
+    are appended to a CSV table (read by plot_figures) as cells complete,
+    the Excel workbook is only written once all cells are done.
+
+    :param filename: directory of the test cases created by generate_comparison_testcases,
+                     only holds the results if the test cases are generated
+                     on the fly (TEST_CONFIGURATION['generateTestCases'])
+    :param excel_filename: Excel file of the results
+    :param jobs: number of worker processes, sweep cells and chunks of test
+                 cases of a cell are run in parallel if jobs > 1
+    :param profile_dir: if given, write per sweep cell the cProfile stats
+                        (.pstats), the sampled stacks for flame graphs
+                        (.collapsed) and the solver phase timers (.spans.json)
+                        of the test cases run to this directory
+    """
     alphabet = TEST_CONFIGURATION['alphabet']
     totalCases = TEST_CONFIGURATION['totalCases']
     numStringsList = TEST_CONFIGURATION['K']
     hammingDistList = TEST_CONFIGURATION['d']
     stringLengthList = TEST_CONFIGURATION['L']
     maxTries = TEST_CONFIGURATION['maxTries']
-    configuration_df = pd.DataFrame(TEST_CONFIGURATION.items())
+    seed = TEST_CONFIGURATION['seed']
+    generateTestCases = TEST_CONFIGURATION['generateTestCases']
+    cpuTime = TEST_CONFIGURATION['cpuTime']
+
+    if profile_dir is not None:
+        profile_dir = os.path.abspath(profile_dir)
+        os.makedirs(profile_dir, exist_ok=True)
 
     testcase_dir = filename
+    if generateTestCases:
+        os.makedirs(testcase_dir, exist_ok=True)
     os.chdir(testcase_dir)
 
-    allResults = []
+    journal = SweepJournal(excel_filename + ".journal",
+                           {"filename": filename, "configuration": TEST_CONFIGURATION})
+
+    cells = []
     for numStrings in numStringsList:
         for ham in hammingDistList:
             for s in stringLengthList:
-                if skipTest(alphabet, numStrings, ham, s):
-                    continue
-
-                print("numStrings = %d, hamming distance=%d, string length=%d" % (numStrings, ham, s))
-                testCase_filename = "%s_testcase_%d_%d_%d" % (filename, numStrings, ham, s)
-                testCases = load_testcases_from_file(testCase_filename)
-
-                testCaseExcel = testCase_filename + "_WFC_CSP_maxTries_%d.xlsx" % TEST_CONFIGURATION['maxTries']
-                testCaseStats = []
-                numCases = 0
-                numCasesFailed = 0
-                numCasesSaved = 0
-
-                closestStringMaxSolutionDists = []
-                closestStringAvgSolutionDists = []
-                closestStringAlgoStartTime = timeit.default_timer()
-                while numCases < totalCases:
-                    testCase = testCases[numCases]
-                    testCaseResult, testCaseSolution = checkTestCase(testCase.numStrings, testCase.inputStrings, testCase.answer, testCase.alphabet, testCase.maxDistance)
-                    if testCaseResult is False:
-                        numCasesFailed += 1
-
-                    tries = 1
-                    while testCaseResult is False and tries < maxTries:
-                        tries += 1
-                        random.shuffle(testCase.inputStrings)
-                        testCaseResult, testCaseSolution = checkTestCase(testCase.numStrings, testCase.inputStrings, testCase.answer, testCase.alphabet, testCase.maxDistance)
-
-                        if testCaseResult is True:
-                            numCasesSaved += 1
-                            break
-
-                    testCaseStat = dict()
-                    testCaseStat["Testcase No."] = numCases
-                    testCaseStat["Tries"] = tries
-                    testCaseStats.append(testCaseStat)
-
-                    numCases += 1
-                    maxSolutionDist, avgDist = getHammingDistanceMaxAndAvg(testCase.inputStrings,
-                                                                  testCaseSolution)
-                    closestStringMaxSolutionDists.append(maxSolutionDist)
-                    closestStringAvgSolutionDists.append(avgDist)
-                closestStringAlgoEndTime = timeit.default_timer()
-                closestStringAverageMaxSolutionDistance = sum(closestStringMaxSolutionDists) / float(totalCases * ham)
-                closestStringAverageAvgSolutionDistance = sum(closestStringAvgSolutionDists) / float(totalCases * ham)
-
-                result = dict()
-                result["Algorithm"] = "WFC-CSP"
-                result["Alphabet Size"] = len(alphabet)
-                result["k"] = numStrings
-                result["d"] = ham
-                result["L"] = s
-                result["Time"] = (closestStringAlgoEndTime - closestStringAlgoStartTime) / totalCases
-                result["Total"] = totalCases
-                result["Failed"] = numCasesFailed
-                result["Saved"] = numCasesSaved
-                result["Average Max Solution Distance/d"] = closestStringAverageMaxSolutionDistance
-                result["Average Max Solution Distance"] = closestStringAverageMaxSolutionDistance * ham
-                result["Average Avg Solution Distance"] = closestStringAverageAvgSolutionDistance
-                result["Success Rate"] = (totalCases - numCasesFailed + numCasesSaved) / totalCases
-                print(result)
-                allResults.append(result)
-                print("Closest String Algorithm Execute Time (%d tests)" % totalCases, closestStringAlgoEndTime - closestStringAlgoStartTime)
-                print("numStrings=%d Hamming Distance=%d StringLength=%d: failed %d, saved %d" % (numStrings, ham, s, numCasesFailed, numCasesSaved))
-                print("Average Max Answer Distance=%f and Average Avg Solution Distance=%f" % (closestStringAverageMaxSolutionDistance, closestStringAverageAvgSolutionDistance))
-                df = pd.DataFrame(allResults, columns=["Algorithm", "Alphabet Size", "k", "d", "L", "Time", "Total", "Failed", "Saved", "Average Max Solution Distance/d", "Average Max Solution Distance", "Average Avg Solution Distance", "Success Rate"])
-                with pd.ExcelWriter(excel_filename) as excelWriter:
-                    df.to_excel(excelWriter, index=False)
-                    configuration_df.to_excel(excelWriter, sheet_name="README", index=False)
-
-                testCaseStats_df = pd.DataFrame(testCaseStats, columns=["Testcase No.", "Tries"])
-                testCaseStats_df.to_excel(testCaseExcel, index=False)
-
-                """
-                # Fixed Position (CSD) algorithm
-                if ham > 10:
-                    # skip CSD algorithm if hamming distance > 10
-                    continue
-                
-                if ham == 10 and s > 80:
-                    continue
+                if not skipTest(alphabet, numStrings, ham, s):
+                    cells.append((numStrings, ham, s))
 
-                fixedParameterAlgoStartTime = timeit.default_timer()
-                fixedParameterMaxSolutionDists = []
-                fixedParameterAvgSolutionDists = []
-                fixedParameterAlgoSuccessCount = 0
-                numCases = 0
-                for testcase in testCases:
-                    numCases += 1
-                    fixedParameterAlgoSolution = CSd(testcase.inputStrings,
-                                                   testcase.maxDistance,
-                                                   testcase.inputStrings[0],
-                                                   testcase.maxDistance)
-                    if fixedParameterAlgoSolution != NOT_FOUND:
-                        fixedParameterAlgoSuccessCount += 1
-                    maxSolutionDist, avgDist = getHammingDistanceMaxAndAvg(testcase.inputStrings,
-                                                                  fixedParameterAlgoSolution)
-                    fixedParameterMaxSolutionDists.append(maxSolutionDist)
-                    fixedParameterAvgSolutionDists.append(avgDist)
-                fixedParameterAlgoEndTime = timeit.default_timer()
-                fixedParameterAverageMaxSolutionDistance = sum(fixedParameterMaxSolutionDists) / float(totalCases * ham)
-                fixedParameterAverageAvgSolutionDistance = sum(fixedParameterAvgSolutionDists) / float(totalCases * ham)
-
-                result = dict()
-                result["Algorithm"] = "FP"
-                result["Alphabet Size"] = len(alphabet)
-                result["k"] = numStrings
-                result["d"] = ham
-                result["L"] = s
-                result["Time"] = (fixedParameterAlgoEndTime - fixedParameterAlgoStartTime) / totalCases
-                result["Total"] = totalCases
-                result["Failed"] = totalCases - fixedParameterAlgoSuccessCount
-                result["Saved"] = 0
-                result["Average Max Solution Distance/d"] = fixedParameterAverageMaxSolutionDistance
-                result["Average Max Solution Distance"] = fixedParameterAverageMaxSolutionDistance * ham
-                result["Average Avg Solution Distance"] = fixedParameterAverageAvgSolutionDistance
-                result["Success Rate"] = fixedParameterAlgoSuccessCount / totalCases
+    resultsTable = ResultsTable(results_csv_filename(excel_filename), RESULT_COLUMNS,
+                                [result for cell in cells if cell in journal.cellResults
+                                 for result in journal.cellResults[cell]])
 
+    def cell_arguments(cell):
+        numStrings, ham, s = cell
+        if generateTestCases:
+            testCase_filename = GeneratedCorpus(alphabet, totalCases, numStrings, s, ham, seed)
+        else:
+            testCase_filename = os.path.abspath("%s_testcase_%d_%d_%d" % (filename, numStrings, ham, s))
+        # Fixed Position (CSD) algorithm, skipped for large hamming distance
+        runFixedParameter = TEST_CONFIGURATION['fixedParameter'] and ham <= TEST_CONFIGURATION['fixedParameterMaxD']
+        return testCase_filename, runFixedParameter
+
+    def missing_cases(cell, runFixedParameter):
+        doneCases = set(journal.cases("WFC-CSP", cell))
+        if runFixedParameter:
+            doneCases &= set(journal.cases("FP", cell))
+        return [caseIndex for caseIndex in range(totalCases) if caseIndex not in doneCases]
+
+    def record_chunk(future):
+        # called in the main thread, so the records of a chunk are in the
+        # journal before its cell is summarized
+        cell = chunkCells.pop(future)
+        if future.exception() is None:
+            wfcRecords, fpRecords = future.result()
+            journal.record_cases("WFC-CSP", cell, wfcRecords)
+            journal.record_cases("FP", cell, fpRecords)
+
+    # in parallel mode the missing cases of every cell are split into
+    # chunks, all chunks are scheduled up front and checkpointed as soon as
+    # they finish; cells are summarized in cell order
+    executor = None
+    cellFutures = {}
+    # cell of every chunk not yet recorded in the journal
+    chunkCells = {}
+    # case indexes of the chunks of every cell run by this sweep
+    cellChunks = {}
+    if profile_dir is not None:
+        # profile parts of unfinished cells left by an interrupted sweep
+        for cell in cells:
+            if cell not in journal.cellResults:
+                removeParts(cell_profile_prefix(profile_dir, cell))
+    try:
+        if jobs > 1:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+            chunkCases = -(-totalCases // jobs)
+            for cell in cells:
+                if cell in journal.cellResults:
+                    continue
+                testCase_filename, runFixedParameter = cell_arguments(cell)
+                caseIndexes = missing_cases(cell, runFixedParameter)
+                cellFutures[cell] = []
+                cellChunks[cell] = [caseIndexes[start:start + chunkCases]
+                                    for start in range(0, len(caseIndexes), chunkCases)]
+                for chunk in cellChunks[cell]:
+                    future = executor.submit(run_comparison_chunk, testCase_filename, cell, chunk, maxTries,
+                                             runFixedParameter, seed, None, profile_dir, cpuTime)
+                    chunkCells[future] = cell
+                    cellFutures[cell].append(future)
+
+        for cell in cells:
+            numStrings, ham, s = cell
+            if cell in journal.cellResults:
+                print("numStrings = %d, hamming distance=%d, string length=%d: done" % (numStrings, ham, s))
+                continue
+
+            print("numStrings = %d, hamming distance=%d, string length=%d" % (numStrings, ham, s))
+            testCase_filename, runFixedParameter = cell_arguments(cell)
+
+            if executor is not None:
+                futures = cellFutures.pop(cell)
+                # record the chunks of every cell as they finish, until all
+                # chunks of this cell are recorded
+                while any(future in chunkCells for future in futures):
+                    done, notDone = concurrent.futures.wait(list(chunkCells),
+                                                            return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        record_chunk(future)
+                for future in futures:
+                    # re-raise worker errors
+                    future.result()
+            else:
+                cellChunks[cell] = [missing_cases(cell, runFixedParameter)]
+                run_comparison_chunk(testCase_filename, cell, cellChunks[cell][0], maxTries,
+                                     runFixedParameter, seed, journal, profile_dir, cpuTime)
+            if profile_dir is not None:
+                merge_cell_profile(profile_dir, cell, cellChunks.pop(cell))
+            wfcRecords = [record for caseIndex, record in sorted(journal.cases("WFC-CSP", cell).items())]
+            fpRecords = [record for caseIndex, record in sorted(journal.cases("FP", cell).items())]
+
+            cellResults = []
+            result = summarize_wfc_cell(alphabet, cell, wfcRecords)
+            print(result)
+            cellResults.append(result)
+            print("Closest String Algorithm Execute Time (%d tests)" % totalCases, result["Time"] * totalCases)
+            print_time_distribution(result)
+            print("numStrings=%d Hamming Distance=%d StringLength=%d: failed %d, saved %d" % (numStrings, ham, s, result["Failed"], result["Saved"]))
+            print("Average Max Answer Distance=%f and Average Avg Solution Distance=%f" % (result["Average Max Solution Distance/d"], result["Average Avg Solution Distance"]))
+
+            if runFixedParameter:
+                result = summarize_fp_cell(alphabet, cell, fpRecords)
                 print(result)
                 print()
-                allResults.append(result)
+                cellResults.append(result)
+
+            journal.record_cell(cell, cellResults)
+            resultsTable.append(cellResults)
+    finally:
+        if executor is not None:
+            # do not run the queued chunks, e.g. after a chunk failed, but
+            # keep the chunks that finished or were running
+            executor.shutdown(wait=True, cancel_futures=True)
+            for future in list(chunkCells):
+                if not future.cancelled():
+                    record_chunk(future)
+
+    resultsTable.close()
+    export_comparison_excel(excel_filename, journal, cells)
+    journal.close()
+
+
+def generate_testcase_cell(filename, cell, alphabet, totalCases, seed, antArchive=False):
+    """
+    generate the test case file and the ant instance files of one sweep
+    cell, in this or a worker process
+    :param filename: test case directory, also the prefix of the test case files
+    :param antArchive: write the ant instance files to one archive
+    """
+    numStrings, ham, s = cell
+    testCase_filename = "%s_testcase_%d_%d_%d" % (filename, numStrings, ham, s)
+    testCase_path = os.path.join(filename, testCase_filename)
+    writeGeneratedCell(testCase_path, alphabet, totalCases, numStrings, s, ham, seed)
+    testCases = load_testcases_from_file(testCase_path)
+    if antArchive:
+        save_testcases_to_ant_archive(testCases, testCase_path + "_ant.zip", testCase_filename)
+        return
+    testCase_ant_dir = testCase_path + "_ant"
+    try:
+        os.mkdir(testCase_ant_dir)
+    except FileExistsError:
+        pass
+    save_testcases_to_ant_instance_files(testCases, os.path.join(testCase_ant_dir, testCase_filename))
 
-                df = pd.DataFrame(allResults, columns=["Algorithm", "Alphabet Size", "k", "d", "L", "Time", "Total", "Failed", "Saved", "Average Max Solution Distance/d", "Average Max Solution Distance", "Average Avg Solution Distance", "Success Rate"])
-                with pd.ExcelWriter(excel_filename) as excelWriter:
-                    df.to_excel(excelWriter, index=False)
-                    configuration_df.to_excel(excelWriter, sheet_name="README", index=False)
-                """
 
+def generate_comparison_testcases(filename, jobs=1):
+    """
+    The test cases of every sweep cell are drawn as arrays from a random
+    generator seeded with the configuration seed and the cell, so the
+    generated files are identical for any cell order or number of jobs.
 
-def generate_comparison_testcases(filename):
+    :param filename: directory of the test cases, created
+    :param jobs: number of worker processes generating cells in parallel
+    """
     alphabet = TEST_CONFIGURATION['alphabet']
     totalCases = TEST_CONFIGURATION['totalCases']
     numStringsList = TEST_CONFIGURATION['K']
     hammingDistList = TEST_CONFIGURATION['d']
     stringLengthList = TEST_CONFIGURATION['L']
+    seed = TEST_CONFIGURATION['seed']
+    antArchive = TEST_CONFIGURATION['antArchive']
 
     testcase_dir = filename
     os.mkdir(testcase_dir)
-    os.chdir(testcase_dir)
 
+    cells = []
     for numStrings in numStringsList:
         for ham in hammingDistList:
             for s in stringLengthList:
-                if skipTest(alphabet, numStrings, ham, s):
-                    continue
+                if not skipTest(alphabet, numStrings, ham, s):
+                    cells.append((numStrings, ham, s))
+
+    if jobs > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(generate_testcase_cell, filename, cell, alphabet, totalCases, seed, antArchive)
+                       for cell in cells]
+            for cell, future in zip(cells, futures):
+                future.result()
+                print("numStrings = %d, hamming distance=%d, string length=%d" % cell)
+    else:
+        for cell in cells:
+            print("numStrings = %d, hamming distance=%d, string length=%d" % cell)
+            generate_testcase_cell(filename, cell, alphabet, totalCases, seed, antArchive)
 
-                print("numStrings = %d, hamming distance=%d, string length=%d" % (numStrings, ham, s))
-                testCases = create_working_testcases(alphabet, numStrings, s, ham, totalCases)
-                testCase_filename = "%s_testcase_%d_%d_%d" % (filename, numStrings, ham, s)
-                save_testcases_to_file(testCases, testCase_filename)
-                testCase_ant_dir = testCase_filename+"_ant"
-                try:
-                    os.mkdir(testCase_ant_dir)
-                except FileExistsError:
-                    pass
-                save_testcases_to_ant_instance_files(testCases, os.path.join(testCase_ant_dir, testCase_filename))
+
+def load_comparison_results(filename):
+    """
+    :param filename: CSV results table or Excel workbook of generate_comparison_data,
+                     the CSV table next to a workbook is read instead if it exists
+    :return: DataFrame of the cell results
+    """
+    import pandas as pd
+
+    if not filename.endswith(".csv") and os.path.exists(results_csv_filename(filename)):
+        filename = results_csv_filename(filename)
+    if filename.endswith(".csv"):
+        return pd.read_csv(filename)
+    return pd.read_excel(filename, index_col=None)
 
 
 def plot_figures(filename):
-    df = pd.read_excel(filename, index_col=None)
+    import matplotlib.pyplot as plt
+
+    df = load_comparison_results(filename)
     # convert time from seconds to millisecons
     df["Time"] = df["Time"] * 1000.0
 
@@ -766,14 +1453,14 @@ def plot_figures(filename):
 
 
 def main_comaprison_plot():
+    import matplotlib.pyplot as plt
+
     alphabet = ["a", "c", "g", "t"]
     numStrings = 10
     totalCases = 1000
 
     numStringsList = [10, 20, 40, 80]
 
-    answers = []
-    inputStrings = []
     hammingDistList = [10, 20, 40, 80]
     stringLengthList = [20, 40, 60, 80, 100, 120, 140, 160, 180, 200]
 
@@ -796,7 +1483,7 @@ def main_comaprison_plot():
     plt.figure(figsize=(11.0, 8.5))
     plt.xlabel("String Length")
     plt.xticks(stringLengthList)
-    plt.ylabel("Processing Time (seconds)")
+    plt.ylabel("Median Processing Time per Case (seconds)")
     title="Processing Time vs String Length (K=%d, Alphabet Size=%d)" % (numStrings, len(alphabet))
     plt.title(title)
 
@@ -809,32 +1496,20 @@ def main_comaprison_plot():
 
                 testCases = create_working_testcases(alphabet, numStrings, s, ham, totalCases)
                 #(alphabet, numStrings, stringLength, k, testcaseCount)
-                numCases = 0
-                numCasesFailed = 0
-                numCasesSaved = 0
-                closestStringAlgoStartTime = timeit.default_timer()
-                while numCases < totalCases:
-                    testCase = testCases[numCases]
-                    caseResult = checkTestCase(testCase.numStrings, testCase.inputStrings, testCase.answer, testCase.alphabet, testCase.maxDistance)
-                    timesToTryAgain = 0
-                    while caseResult is False and timesToTryAgain <= 1:
-                        if timesToTryAgain == 0:
-                            numCasesFailed += 1
-                        random.shuffle(inputStrings)
-                        caseResult = checkTestCase(testCase.numStrings, testCase.inputStrings, testCase.answer, testCase.alphabet, testCase.maxDistance)
-                        if caseResult == True:
-                            numCasesSaved += 1
-                            break
-                        timesToTryAgain += 1
-                    numCases += 1
-                closestStringAlgoEndTime = timeit.default_timer()
-                smallList = [ham, s, closestStringAlgoEndTime-closestStringAlgoStartTime]
+                # first try and up to two retries per case
+                cell = (numStrings, ham, s)
+                wfcRecords = [run_wfc_case(testCase, 3, case_seed(TEST_CONFIGURATION['seed'], "WFC-CSP", *cell, caseIndex),
+                                           cpuTime=TEST_CONFIGURATION['cpuTime'])
+                              for caseIndex, testCase in enumerate(testCases)]
+                result = summarize_wfc_cell(alphabet, cell, wfcRecords)
+                smallList = [ham, s, result["Time Median"]]
                 grandList.append(smallList)
-                print("Closest String Algorithm Execute Time (%d tests)" % totalCases, closestStringAlgoEndTime - closestStringAlgoStartTime)
-                print("numStrings=%d Hamming Distance=%d StringLength=%d: failed %d, saved %d" % (numStrings, ham, s, numCasesFailed, numCasesSaved))
+                print("Closest String Algorithm Execute Time (%d tests)" % totalCases, result["Time"] * totalCases)
+                print_time_distribution(result)
+                print("numStrings=%d Hamming Distance=%d StringLength=%d: failed %d, saved %d" % (numStrings, ham, s, result["Failed"], result["Saved"]))
                 print()
             xAxis = [row[1] for row in grandList]
-            yAxis = [row[2]/totalCases for row in grandList]
+            yAxis = [row[2] for row in grandList]
             label = "%d strings, Hamming distance %d " % (numStrings, ham)
             plt.plot(xAxis, yAxis, label=label, linestyle=plot_line_style[numStrings], marker=plot_marker[ham])
 
@@ -843,6 +1518,20 @@ def main_comaprison_plot():
     plt.show()
 
 
+def pop_option(argv, option, default=None):
+    """
+    remove "option value" from argv
+    :return: the option value, or default if option is not in argv
+    """
+    if option not in argv:
+        return default
+    index = argv.index(option)
+    assert index + 1 < len(argv), "Need value for %s" % option
+    value = argv[index + 1]
+    del argv[index:index + 2]
+    return value
+
+
 def main():
     alphabet = ["a", "c", "g", "t"]
     numStrings = 10
@@ -850,62 +1539,78 @@ def main():
     k = 60   # maximum Hamming distance
 
     testcaseCount = 1000
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--generate":
-            assert len(sys.argv) == 3, "Need filename to save generated testcases"
-            filename = sys.argv[2]
+    argv = sys.argv[:]
+    jobs = int(pop_option(argv, "--jobs", 1))
+    # directory of the per sweep cell profiles
+    profile_dir = pop_option(argv, "--profile")
+    if len(argv) > 1:
+        if argv[1] == "--generate":
+            assert len(argv) == 3, "Need filename to save generated testcases"
+            filename = argv[2]
             testcases = create_working_testcases(alphabet, numStrings, stringLength, k, testcaseCount)
             save_testcases_to_file(testcases, filename)
 
-        elif sys.argv[1] == "--generate-ant-instances":
-            assert len(sys.argv) == 3, "Need filename to save generated testcases"
-            filename = sys.argv[2]
+        elif argv[1] == "--generate-ant-instances":
+            assert len(argv) == 3, "Need filename to save generated testcases"
+            filename = argv[2]
             testcases = create_working_testcases(alphabet, numStrings, stringLength, k, testcaseCount)
             save_testcases_to_ant_instance_files(testcases, filename)
 
-        elif sys.argv[1] == "--load":
-            assert len(sys.argv) == 3, "Need filename to load generated testcases"
-            filename = sys.argv[2]
+        elif argv[1] == "--load":
+            assert len(argv) == 3, "Need filename to load generated testcases"
+            filename = argv[2]
             testcases = load_testcases_from_file(filename)
             for testcase in testcases:
                 testcase.print()
 
-        elif sys.argv[1] == "--compare":
-            assert len(sys.argv) == 3, "Need filename to load generated testcases"
-            filename = sys.argv[2]
+        elif argv[1] == "--compare":
+            assert len(argv) == 3, "Need filename to load generated testcases"
+            filename = argv[2]
             testcases = load_testcases_from_file(filename)
-            compare_algorithms(testcases)
+            compare_algorithms(testcases, profile_dir)
 
-        elif sys.argv[1] == "--compare-with-ant":
+        elif argv[1] == "--compare-with-ant":
             assert len(
-                sys.argv) == 3, "Need filename to load generated testcases"
-            filename = sys.argv[2]
+                argv) == 3, "Need filename to load generated testcases"
+            filename = argv[2]
             testcases = load_testcases_from_file(filename)
             save_testcases_to_ant_instance_files(testcases, filename+"_ant")
             compare_closest_algorithm_with_ant(testcases)
 
-        elif sys.argv[1] == "--generate-comparison-data":
+        elif argv[1] == "--generate-comparison-data":
             assert len(
-                sys.argv) >= 3, "Need filename (.xlsx) to load generated testcases"
-            filename = sys.argv[2]
+                argv) >= 3, "Need filename (.xlsx) to load generated testcases"
+            filename = argv[2]
             excel_filename = filename + ".xlsx"
-            if len(sys.argv) == 4:
-                excel_filename = sys.argv[3]
+            if len(argv) == 4:
+                excel_filename = argv[3]
                 if not excel_filename.endswith(".xlsx"):
                     excel_filename = excel_filename + ".xlsx"
-            generate_comparison_data(filename, excel_filename)
-        elif sys.argv[1] == "--generate-comparison-testcases":
+            generate_comparison_data(filename, excel_filename, jobs, profile_dir)
+        elif argv[1] == "--generate-comparison-testcases":
+            assert len(
+                argv) == 3, "Need filename prefix to save generated testcases"
+            filename = argv[2]
+            generate_comparison_testcases(filename, jobs)
+        elif argv[1] == "--extract-ant-archive":
+            assert len(
+                argv) >= 3, "Need ant instance archive to extract"
+            archive_filename = argv[2]
+            directory = argv[3] if len(argv) == 4 else os.path.splitext(archive_filename)[0]
+            os.makedirs(directory, exist_ok=True)
+            extract_ant_archive(archive_filename, directory)
+        elif argv[1] == "--convert-testcases":
             assert len(
-                sys.argv) == 3, "Need filename prefix to save generated testcases"
-            filename = sys.argv[2]
-            generate_comparison_testcases(filename)
-        elif sys.argv[1] == "--plot":
+                argv) == 3, "Need pickled testcases file or directory to convert"
+            filename = argv[2]
+            convert_testcases(filename)
+        elif argv[1] == "--plot":
             assert len(
-                sys.argv) == 3, "Need filename (.xlsx) to load generated testcases"
-            filename = sys.argv[2]
+                argv) == 3, "Need results filename (.csv or .xlsx) to plot"
+            filename = argv[2]
             plot_figures(filename)
         else:
-            print("unknown option/command %s" % sys.argv[1])
+            print("unknown option/command %s" % argv[1])
     else:
         main_comaprison_plot()
 
@@ -0,0 +1,222 @@
+import collections
+import json
+import os
+import pickle
+
+import numpy as np
+
+from encodedInstance import AlphabetCodec, EncodedInstance, asEncodedInstance
+
+# File layout, all integers little endian:
+#   magic                 8 bytes
+#   header length         uint32
+#   header                JSON {"version", "alphabet", "numCases"}, padded to 8 bytes
+#   index                 numCases INDEX_DTYPE entries
+#   cases                 per case the L answer codes then the K x L input string codes
+CORPUS_MAGIC = b"CSPCORP1"
+CORPUS_VERSION = 1
+# number of corpora kept open by openCorpus in every process
+OPEN_CORPUS_LIMIT = 64
+INDEX_DTYPE = np.dtype([("offset", "<u8"),
+                        ("numStrings", "<u4"),
+                        ("stringLength", "<u4"),
+                        ("maxDistance", "<u4"),
+                        ("reserved", "<u4")])
+
+
+def isCorpusFile(filename):
+    with open(filename, "rb") as f:
+        return f.read(len(CORPUS_MAGIC)) == CORPUS_MAGIC
+
+
+def writeCorpus(filename, alphabet, cases):
+    """
+    :param filename: corpus file to write
+    :param alphabet: alphabet of all cases
+    :param cases: list of (answer, input strings, maximum distance), answer
+                  and input strings as letters or letter codes
+    """
+    codec = AlphabetCodec(alphabet)
+    header = json.dumps({"version": CORPUS_VERSION, "alphabet": list(alphabet), "numCases": len(cases)}).encode()
+    header += b" " * (-(len(CORPUS_MAGIC) + 4 + len(header)) % 8)
+
+    index = np.zeros(len(cases), dtype=INDEX_DTYPE)
+    offset = len(CORPUS_MAGIC) + 4 + len(header) + index.nbytes
+    blocks = []
+    for caseIndex, (answer, inputStrings, maxDistance) in enumerate(cases):
+        instance = asEncodedInstance(inputStrings, alphabet)
+        if not isinstance(answer, np.ndarray):
+            answer = codec.encode(answer)
+        assert len(answer) == instance.stringLength, "Answer and input strings must be of same length"
+        index[caseIndex] = (offset, instance.numStrings, instance.stringLength, maxDistance, 0)
+        blocks.append(np.asarray(answer, dtype=np.uint8))
+        blocks.append(instance.matrix)
+        offset += (instance.numStrings + 1) * instance.stringLength
+
+    with open(filename, "wb") as f:
+        f.write(CORPUS_MAGIC)
+        f.write(np.uint32(len(header)).astype("<u4").tobytes())
+        f.write(header)
+        f.write(index.tobytes())
+        for block in blocks:
+            f.write(block.tobytes())
+
+
+def antInstanceText(testcase):
+    """
+    :param testcase: ClosestStringTestCase or CorpusCase
+    :return: the test case in the input format of the ant colony solver
+    """
+    lines = []
+
+    # Alphabet size
+    lines.append(str(len(testcase.alphabet)))
+
+    # number of strings
+    lines.append(str(testcase.numStrings))
+
+    # string length
+    lines.append(str(testcase.stringLength))
+
+    # alphabet
+    lines.append(" ".join(testcase.alphabet))
+
+    for s in testcase.inputStrings:
+        lines.append("".join(s))
+
+    return "\n".join(lines) + "\n"
+
+
+class TestCaseOutput(object):
+    """
+    Printing and ant instance output shared by ClosestStringTestCase and
+    CorpusCase, from their alphabet, sizes, answer and input strings.
+    """
+    def print(self):
+        print("CloseStringTestCase:")
+        print("    alphabet", self.alphabet)
+        print("    numStrings", self.numStrings)
+        print("    stringLength", self.stringLength)
+        print("    maxDistance", self.maxDistance)
+        print("    answer: ", self.answer)
+        print("    inputStrings: ", self.inputStrings)
+
+    def save_to_ant_instance_file(self, filename):
+        with open(filename, "w") as f:
+            f.write(self.to_ant_instance_text())
+
+    def to_ant_instance_text(self):
+        """
+        :return: the test case in the input format of the ant colony solver
+        """
+        return antInstanceText(self)
+
+
+def writeTestCases(filename, testcases):
+    """
+    :param testcases: list of ClosestStringTestCase (or CorpusCase) of one alphabet
+    """
+    writeCorpus(filename, testcases[0].alphabet,
+                [(testcase.answer, testcase.inputStrings, testcase.maxDistance) for testcase in testcases])
+
+
+def convertPickledTestCases(pickleFilename, corpusFilename):
+    """
+    convert a pickled list of ClosestStringTestCase to a corpus file
+    """
+    with open(pickleFilename, "rb") as f:
+        testcases = pickle.load(f)
+    writeTestCases(corpusFilename, testcases)
+
+
+class CorpusCase(TestCaseOutput):
+    """
+    One test case of a Corpus. The input strings and the answer are views of
+    the memory-mapped corpus, letters are only decoded when asked for.
+    """
+    def __init__(self, codec, maxDistance, answer, matrix):
+        self.codec = codec
+        self.maxDistance = maxDistance
+        self.answerCodes = answer
+        self.matrix = matrix
+        self.numStrings, self.stringLength = matrix.shape
+
+    @property
+    def alphabet(self):
+        return self.codec.alphabet
+
+    @property
+    def answer(self):
+        return self.codec.decode(self.answerCodes)
+
+    @property
+    def inputStrings(self):
+        return [self.codec.decode(row) for row in self.matrix]
+
+    def encoded(self):
+        """
+        :return: input strings as EncodedInstance
+        """
+        return EncodedInstance(self.matrix, self.codec)
+
+
+class Corpus(object):
+    """
+    Read access to a corpus file. The file is memory-mapped, so opening it
+    only reads the header and the index, and case i is read from disk when
+    it is used.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            assert f.read(len(CORPUS_MAGIC)) == CORPUS_MAGIC, "%s is not a corpus file" % filename
+            headerLength = int(np.frombuffer(f.read(4), dtype="<u4")[0])
+            header = json.loads(f.read(headerLength))
+        assert header["version"] == CORPUS_VERSION, "Unsupported corpus version %s" % header["version"]
+
+        self.codec = AlphabetCodec(header["alphabet"])
+        self.data = np.memmap(filename, dtype=np.uint8, mode="r")
+        indexOffset = len(CORPUS_MAGIC) + 4 + headerLength
+        self.index = self.data[indexOffset:indexOffset + header["numCases"] * INDEX_DTYPE.itemsize].view(INDEX_DTYPE)
+
+    @property
+    def alphabet(self):
+        return self.codec.alphabet
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, caseIndex):
+        if isinstance(caseIndex, slice):
+            return [self[i] for i in range(*caseIndex.indices(len(self)))]
+        offset, numStrings, stringLength, maxDistance, reserved = self.index[caseIndex].tolist()
+        answer = self.data[offset:offset + stringLength]
+        matrix = self.data[offset + stringLength:offset + (numStrings + 1) * stringLength]
+        return CorpusCase(self.codec, maxDistance, answer, matrix.reshape(numStrings, stringLength))
+
+    def __iter__(self):
+        for caseIndex in range(len(self)):
+            yield self[caseIndex]
+
+
+# open corpora of this process, least recently used first
+_openCorpora = collections.OrderedDict()
+
+
+def openCorpus(filename):
+    """
+    Open a corpus file once per process. Worker processes that open the same
+    file share its pages in the page cache: every case is a read-only view of
+    the mapping, nothing is copied or decoded, so resident memory does not
+    grow with the number of workers.
+
+    :return: Corpus of filename
+    """
+    key = (os.path.abspath(filename), os.stat(filename).st_mtime_ns)
+    corpus = _openCorpora.pop(key, None)
+    if corpus is None:
+        corpus = Corpus(filename)
+        if len(_openCorpora) >= OPEN_CORPUS_LIMIT:
+            _openCorpora.popitem(last=False)
+    _openCorpora[key] = corpus
+    return corpus
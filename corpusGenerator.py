@@ -0,0 +1,98 @@
+import numpy as np
+
+from corpusFormat import CorpusCase, writeCorpus
+from encodedInstance import AlphabetCodec
+
+
+def caseRandomGenerator(seed, alphabetSize, numStrings, maxDistance, stringLength, caseIndex):
+    """
+    :return: numpy random Generator of one test case: a counter-based Philox
+             stream keyed by the seed, the sweep cell and the case index, so
+             every case can be generated on its own, in any order or process
+    """
+    key = np.random.SeedSequence([seed, alphabetSize, numStrings, maxDistance, stringLength, caseIndex])
+    return np.random.Generator(np.random.Philox(key))
+
+
+def perturbStrings(answer, numStrings, maxDistance, alphabetSize, rng):
+    """
+    :param answer: L answer letter codes
+    :return: K x L input strings, each a copy of answer with exactly
+             maxDistance positions changed to another random letter
+    """
+    stringLength = len(answer)
+    matrix = np.repeat(answer[None, :], numStrings, axis=0)
+    if maxDistance == 0:
+        return matrix
+
+    # the maxDistance smallest of L random keys are a uniform random sample
+    # of maxDistance distinct positions
+    keys = rng.random((numStrings, stringLength))
+    positions = np.argpartition(keys, maxDistance - 1, axis=1)[:, :maxDistance]
+
+    # adding 1..alphabetSize-1 modulo alphabetSize picks one of the other
+    # letters uniformly
+    shifts = rng.integers(1, alphabetSize, size=positions.shape, dtype=np.uint8)
+    changed = np.take_along_axis(matrix, positions, axis=1)
+    np.put_along_axis(matrix, positions, (changed + shifts) % alphabetSize, axis=1)
+    return matrix
+
+
+def generateCase(alphabetSize, numStrings, stringLength, maxDistance, seed, caseIndex):
+    """
+    Draw test case caseIndex of a sweep cell in O(K * L), the array
+    equivalent of createRandomTestCase.
+
+    :return: (L answer, K x L input strings) uint8 letter codes
+    """
+    assert alphabetSize > 1, "Need at least two letters to perturb strings"
+    assert maxDistance <= stringLength, "Maximum distance larger than string length"
+    rng = caseRandomGenerator(seed, alphabetSize, numStrings, maxDistance, stringLength, caseIndex)
+    answer = rng.integers(0, alphabetSize, size=stringLength, dtype=np.uint8)
+    return answer, perturbStrings(answer, numStrings, maxDistance, alphabetSize, rng)
+
+
+class GeneratedCorpus(object):
+    """
+    The test cases of one sweep cell, generated when they are used instead
+    of read from a corpus file. Cases are the same as the ones written by
+    writeGeneratedCell with the same arguments. Only the arguments are
+    pickled, so a GeneratedCorpus is cheap to send to worker processes.
+    """
+    def __init__(self, alphabet, numCases, numStrings, stringLength, maxDistance, seed):
+        self.codec = AlphabetCodec(alphabet)
+        self.numCases = numCases
+        self.numStrings = numStrings
+        self.stringLength = stringLength
+        self.maxDistance = maxDistance
+        self.seed = seed
+
+    @property
+    def alphabet(self):
+        return self.codec.alphabet
+
+    def __len__(self):
+        return self.numCases
+
+    def __getitem__(self, caseIndex):
+        if isinstance(caseIndex, slice):
+            return [self[i] for i in range(*caseIndex.indices(len(self)))]
+        if caseIndex < 0:
+            caseIndex += self.numCases
+        if not 0 <= caseIndex < self.numCases:
+            raise IndexError("case index out of range")
+        answer, matrix = generateCase(len(self.codec), self.numStrings, self.stringLength, self.maxDistance,
+                                      self.seed, caseIndex)
+        return CorpusCase(self.codec, self.maxDistance, answer, matrix)
+
+    def __iter__(self):
+        for caseIndex in range(len(self)):
+            yield self[caseIndex]
+
+
+def writeGeneratedCell(filename, alphabet, numCases, numStrings, stringLength, maxDistance, seed):
+    """
+    generate the test cases of one sweep cell and write them as corpus file
+    """
+    corpus = GeneratedCorpus(alphabet, numCases, numStrings, stringLength, maxDistance, seed)
+    writeCorpus(filename, alphabet, [(case.answerCodes, case.matrix, maxDistance) for case in corpus])
@@ -0,0 +1,116 @@
+import numpy as np
+
+from hammingKernel import BitPlanes
+
+# code used for a position that holds no alphabet letter, e.g. the " " of an
+# undecided answer position
+UNDECIDED = 255
+
+
+class AlphabetCodec(object):
+    """
+    Maps the letters of an alphabet to small integer codes 0..len(alphabet)-1
+    and back.
+    """
+    def __init__(self, alphabet):
+        assert len(alphabet) < UNDECIDED, "Alphabet has too many letters for uint8 codes"
+        self.alphabet = list(alphabet)
+        self.codes = {}
+        for code, letter in enumerate(self.alphabet):
+            self.codes[letter] = code
+
+    def __len__(self):
+        return len(self.alphabet)
+
+    def encode(self, string):
+        """
+        :param string: list of letters (or str)
+        :return: uint8 array of letter codes, unknown letters become UNDECIDED
+        """
+        codes = self.codes
+        return np.fromiter((codes.get(letter, UNDECIDED) for letter in string),
+                           dtype=np.uint8, count=len(string))
+
+    def decode(self, codes):
+        """
+        :param codes: sequence of letter codes
+        :return: list of letters, UNDECIDED becomes " "
+        """
+        alphabet = self.alphabet
+        return [alphabet[code] if code != UNDECIDED else " " for code in codes.tolist()]
+
+
+class EncodedInstance(object):
+    """
+    Closest String Problem input strings stored as a contiguous uint8 K x L
+    matrix of letter codes plus the codec of the alphabet.
+    """
+    def __init__(self, matrix, codec):
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.uint8)
+        assert self.matrix.ndim == 2, "Encoded instance needs a K x L matrix"
+        self.codec = codec
+        self.numStrings, self.stringLength = self.matrix.shape
+        self._bitPlanes = None
+
+    @property
+    def alphabet(self):
+        return self.codec.alphabet
+
+    def __len__(self):
+        return self.numStrings
+
+    def __getitem__(self, index):
+        return self.matrix[index]
+
+    def __iter__(self):
+        return iter(self.matrix)
+
+    def bitPlanes(self):
+        """
+        :return: BitPlanes of the input strings, built on first use
+        """
+        if self._bitPlanes is None:
+            self._bitPlanes = BitPlanes(self.matrix, len(self.codec))
+        return self._bitPlanes
+
+    def decode(self):
+        """
+        :return: input strings as list of list of letters
+        """
+        return [self.codec.decode(row) for row in self.matrix]
+
+
+def inferAlphabet(inputStrings):
+    letters = set()
+    for string in inputStrings:
+        letters.update(string)
+    return sorted(letters)
+
+
+def encodeInstance(inputStrings, alphabet=None):
+    """
+    :param inputStrings: list of input strings, each a list of letters
+    :param alphabet: alphabet used to create the input strings, inferred from
+                     the input strings if not given
+    :return: EncodedInstance
+    """
+    if alphabet is None:
+        alphabet = inferAlphabet(inputStrings)
+    codec = AlphabetCodec(alphabet)
+    matrix = np.empty((len(inputStrings), len(inputStrings[0])), dtype=np.uint8)
+    for index in range(len(inputStrings)):
+        matrix[index] = codec.encode(inputStrings[index])
+    return EncodedInstance(matrix, codec)
+
+
+def asEncodedInstance(inputStrings, alphabet=None):
+    """
+    Input adapter: accepts an EncodedInstance, a K x L array of letter codes
+    or the list of list of letters form.
+    """
+    if isinstance(inputStrings, EncodedInstance):
+        return inputStrings
+    if isinstance(inputStrings, np.ndarray):
+        assert alphabet is not None, "Need alphabet to adapt an array of letter codes"
+        return EncodedInstance(inputStrings, AlphabetCodec(alphabet))
+    return encodeInstance(inputStrings, alphabet)
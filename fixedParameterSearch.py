@@ -0,0 +1,199 @@
+import time
+
+import numpy as np
+
+from randomSource import asRandom
+
+NOT_FOUND = "not found"
+
+
+class CSdStats(object):
+    """
+    Optional statistics collector of the CSd search. One collector can be
+    passed to many searches, e.g. all test cases of a sweep cell.
+    """
+    def __init__(self):
+        self.searches = 0
+        self.nodes = 0
+        self.maxDepth = 0
+        self.depthTotal = 0
+        self.depthHistogram = {}
+        self.prunesD0 = 0
+        self.prunesD1 = 0
+        # number of D3 nodes and children actually expanded by them
+        self.nodesD3 = 0
+        self.branchesD3 = 0
+        # seconds spent computing and updating distances
+        self.distanceTime = 0.0
+
+    def visit(self, depth, count=1):
+        self.nodes += count
+        self.depthTotal += depth * count
+        self.depthHistogram[depth] = self.depthHistogram.get(depth, 0) + count
+        if depth > self.maxDepth:
+            self.maxDepth = depth
+
+    @property
+    def averageDepth(self):
+        return self.depthTotal / self.nodes if self.nodes else 0.0
+
+    @property
+    def averageBranching(self):
+        return self.branchesD3 / self.nodesD3 if self.nodesD3 else 0.0
+
+    def merge(self, other):
+        self.searches += other.searches
+        self.nodes += other.nodes
+        self.maxDepth = max(self.maxDepth, other.maxDepth)
+        self.depthTotal += other.depthTotal
+        for depth, count in other.depthHistogram.items():
+            self.depthHistogram[depth] = self.depthHistogram.get(depth, 0) + count
+        self.prunesD0 += other.prunesD0
+        self.prunesD1 += other.prunesD1
+        self.nodesD3 += other.nodesD3
+        self.branchesD3 += other.branchesD3
+        self.distanceTime += other.distanceTime
+
+    def toState(self):
+        """
+        :return: JSON serializable state of the collector
+        """
+        state = dict(self.__dict__)
+        state["depthHistogram"] = [[depth, count] for depth, count in self.depthHistogram.items()]
+        return state
+
+    @staticmethod
+    def fromState(state):
+        stats = CSdStats()
+        stats.__dict__.update(state)
+        stats.depthHistogram = dict((depth, count) for depth, count in state["depthHistogram"])
+        return stats
+
+    def asDict(self):
+        """
+        :return: the statistics as result columns, node and prune counts are
+                 per search
+        """
+        searches = max(self.searches, 1)
+        result = dict()
+        result["CSd Nodes"] = self.nodes / searches
+        result["CSd Max Depth"] = self.maxDepth
+        result["CSd Avg Depth"] = self.averageDepth
+        result["CSd D0 Prunes"] = self.prunesD0 / searches
+        result["CSd D1 Prunes"] = self.prunesD1 / searches
+        result["CSd D3 Branching"] = self.averageBranching
+        result["CSd Distance Time"] = self.distanceTime / searches
+        return result
+
+
+def changeLetter(s, distances, letterMatches, position, letter):
+    """
+    set s[position] to letter and update the distances between s and the
+    input strings in O(K)
+    :param letterMatches: letterMatches[position, code] is 1 for the input
+                          strings with letter code at position, 0 otherwise
+    """
+    matches = letterMatches[position]
+    distances += matches[s[position]]
+    distances -= matches[letter]
+    s[position] = letter
+
+
+def searchCSd(instance, d, s, deltaD, distances, stats=None, rng=None):
+    """
+    Iterative CSd: the same depth first search as the recursive CSd, with
+    an explicit stack. One working copy of s is changed in place and its
+    distances to the input strings are updated incrementally instead of being
+    recomputed at every node.
+
+    :param instance: EncodedInstance of the input strings S
+    :param d: integer d
+    :param s: uint8 letter codes of the candidate string s
+    :param deltaD: integer deltaD
+    :param distances: int array of the Hamming distances between s and the
+                      input strings
+    :param stats: optional CSdStats collector
+    :param rng: random source (random.Random or int seed), the module level
+                random if None
+    :return: uint8 letter codes of the result string or NOT_FOUND
+    """
+    rng = asRandom(rng)
+    matrix = instance.matrix
+    codes = np.arange(len(instance.codec), dtype=np.uint8)
+    letterMatches = (matrix.T[:, None, :] == codes[None, :, None]).astype(np.intp)
+    s = np.array(s, dtype=np.uint8)
+    assert s.max() < len(instance.codec), "Candidate string s has letters outside the alphabet of the instance"
+    distances = np.array(distances, dtype=np.intp)
+
+    if stats is not None:
+        stats.searches += 1
+
+    # every frame is a D3 node still expanding its children:
+    # [deltaD of the node, si, P', next child, changed position, replaced letter]
+    stack = []
+    while True:
+        if stats is not None:
+            stats.visit(len(stack))
+
+        # D0
+        if deltaD < 0:
+            if stats is not None:
+                stats.prunesD0 += 1
+        else:
+            maxDistance = distances.max()
+            # D1
+            if maxDistance > d + deltaD:
+                if stats is not None:
+                    stats.prunesD1 += 1
+            # D2
+            elif maxDistance <= d:
+                return s
+            else:
+                # D3
+                # randomly pick some i from all stringIndex that Dh(s, si) > d,
+                # listed by decreasing distance (ties by index) like the
+                # recursive CSd, so both make the same draws
+                order = np.argsort(-distances, kind="stable")
+                i = rng.choice(order[distances[order] > d].tolist())
+                si = matrix[i]
+
+                # find P and randomly choose d+1 from P
+                P = np.flatnonzero(s != si).tolist()
+                PPrime = rng.sample(P, d + 1)
+                stack.append([deltaD, si, PPrime, 0, None, None])
+
+                if stats is not None:
+                    stats.nodesD3 += 1
+                    if deltaD == 0:
+                        # every child is pruned at D0 without being changed
+                        stats.visit(len(stack), len(PPrime))
+                        stats.prunesD0 += len(PPrime)
+                        stats.branchesD3 += len(PPrime)
+
+        # move to the next child of the deepest unfinished D3 node
+        while stack:
+            frame = stack[-1]
+            nodeDeltaD, si, PPrime, nextChild, changedPosition, replacedLetter = frame
+            if stats is not None:
+                startTime = time.perf_counter_ns()
+            if changedPosition is not None:
+                # undo the change of the previous child
+                changeLetter(s, distances, letterMatches, changedPosition, replacedLetter)
+                frame[4] = None
+
+            if nextChild < len(PPrime) and nodeDeltaD > 0:
+                p = PPrime[nextChild]
+                frame[3] = nextChild + 1
+                frame[4] = p
+                frame[5] = s[p]
+                changeLetter(s, distances, letterMatches, p, si[p])
+                deltaD = nodeDeltaD - 1
+                if stats is not None:
+                    stats.branchesD3 += 1
+                    stats.distanceTime += (time.perf_counter_ns() - startTime) / 1e9
+                break
+            if stats is not None:
+                stats.distanceTime += (time.perf_counter_ns() - startTime) / 1e9
+            stack.pop()
+        else:
+            return NOT_FOUND
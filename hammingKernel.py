@@ -0,0 +1,75 @@
+import numpy as np
+
+# number of set bits of every byte value
+POPCOUNT_TABLE = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def matchCounts(words1, words2):
+    """
+    :param words1: uint64 bit plane words, broadcastable against words2
+    :param words2: uint64 bit plane words
+    :return: number of common set bits, summed over the last axis
+    """
+    common = words1 & words2
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(common).sum(axis=-1, dtype=np.intp)
+    return POPCOUNT_TABLE[common.view(np.uint8)].sum(axis=-1, dtype=np.intp)
+
+
+class BitPlanes(object):
+    """
+    One-hot bit planes of a set of encoded strings.
+
+    Every string gets one packed bit plane per alphabet letter, with bit p set
+    when the string has that letter at position p. Two strings agree at a
+    position exactly when one of their planes has the bit set in both, so
+    Hamming distance = L - popcount(planes1 & planes2). Positions holding no
+    alphabet letter (UNDECIDED) have no bit set and always count as mismatch.
+    """
+    def __init__(self, matrix, alphabetSize):
+        matrix = np.atleast_2d(matrix)
+        numStrings, stringLength = matrix.shape
+        self.stringLength = stringLength
+        self.alphabetSize = alphabetSize
+        self.codes = np.arange(alphabetSize, dtype=np.uint8)[:, None]
+
+        # every row is padded to whole uint64 words
+        planeBytes = alphabetSize * ((stringLength + 7) // 8)
+        self.wordCount = (planeBytes + 7) // 8
+
+        onehot = matrix[:, None, :] == self.codes[None, :, :]
+        packed = np.zeros((numStrings, self.wordCount * 8), dtype=np.uint8)
+        packed[:, :planeBytes] = np.packbits(onehot, axis=2).reshape(numStrings, planeBytes)
+        self.words = packed.view(np.uint64)
+
+    def packString(self, string):
+        """
+        :param string: uint8 array of letter codes of length stringLength
+        :return: uint64 bit plane words of string
+        """
+        packed = np.packbits(string == self.codes, axis=1).ravel()
+        words = np.zeros(self.wordCount * 8, dtype=np.uint8)
+        words[:packed.size] = packed
+        return words.view(np.uint64)
+
+    def __len__(self):
+        return self.words.shape[0]
+
+
+def distancesOneToMany(string, planes):
+    """
+    :param string: uint8 array of letter codes
+    :param planes: BitPlanes of the strings to compare with
+    :return: int array of the Hamming distances between string and every string of planes
+    """
+    return planes.stringLength - matchCounts(planes.words, planes.packString(string))
+
+
+def distancesManyToMany(planes1, planes2):
+    """
+    :param planes1: BitPlanes of K1 strings
+    :param planes2: BitPlanes of K2 strings of the same length
+    :return: K1 x K2 int array of Hamming distances
+    """
+    assert planes1.stringLength == planes2.stringLength, "Strings must be of same length"
+    return planes1.stringLength - matchCounts(planes1.words[:, None, :], planes2.words[None, :, :])
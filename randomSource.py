@@ -0,0 +1,25 @@
+import random
+
+# bits of the seeds drawn for single runs and trajectory batches, few enough
+# to be stored exactly in the result tables (Excel keeps 53 bits)
+SEED_BITS = 32
+
+
+def asRandom(rng=None):
+    """
+    :param rng: random.Random (or an object with its methods), int seed, or
+                None for the module level random state
+    :return: random source with the random.Random methods
+    """
+    if rng is None:
+        return random
+    if isinstance(rng, int):
+        return random.Random(rng)
+    return rng
+
+
+def drawSeed(rng):
+    """
+    :return: seed for a random source of its own, drawn from rng
+    """
+    return rng.getrandbits(SEED_BITS)
@@ -0,0 +1,141 @@
+import numpy as np
+
+from encodedInstance import UNDECIDED
+
+
+class RestartResult(object):
+    def __init__(self, success, answer, tries, maxDistance, seed=None, batchSize=0, trajectory=0):
+        """
+        :param success: True if answer is within the maximum distance
+        :param answer: uint8 letter codes of the first successful or the best
+                       (smallest maximum distance) answer found
+        :param tries: number of WFC-CSP trajectories run
+        :param maxDistance: maximum Hamming distance between answer and the
+                            input strings
+        :param seed: seed of the single run (batchSize 0) or of the batch of
+                     trajectories that found answer
+        :param batchSize: number of trajectories of that batch
+        :param trajectory: row of answer in that batch
+        """
+        self.success = success
+        self.answer = answer
+        self.tries = tries
+        self.maxDistance = maxDistance
+        self.seed = seed
+        self.batchSize = batchSize
+        self.trajectory = trajectory
+        # perf_counter_ns nanoseconds of the first trajectory and of the
+        # batches of retries, set by solveWithRestarts
+        self.solveTime = 0
+        self.retryTime = 0
+
+
+class RestartTables(object):
+    """
+    Tables shared by every WFC-CSP trajectory of one EncodedInstance.
+    """
+    def __init__(self, instance, letterCounts, stats=None):
+        """
+        :param stats: optional WFCStats collector, counts the build
+        """
+        if stats is not None:
+            stats.tableBuilds += 1
+        self.matrix = instance.matrix
+        self.numStrings, self.stringLength = self.matrix.shape
+
+        # columns[position] are the letters of all input strings at position
+        self.columns = np.ascontiguousarray(self.matrix.T)
+
+        # stringScores[index, position] is the scoreboard score of the
+        # (position, letter) that matches input string index
+        positions = np.arange(self.stringLength)
+        self.stringScores = letterCounts.counts[positions[None, :], self.matrix]
+
+
+def randomArgmax(values, rng):
+    """
+    :param values: 2-D array
+    :return: index of a maximum of every row, ties are broken uniformly at random
+    """
+    best = values.max(axis=1, keepdims=True)
+    noise = rng.random(values.shape)
+    return np.argmax(np.where(values == best, noise, -1.0), axis=1)
+
+
+def completeTrajectories(tables, answers, distances, trajectories, letters, stats=None):
+    """
+    fill the undecided positions of the given trajectories with letters and
+    recompute their distances
+    :param letters: trajectories x L letter codes
+    :param stats: optional WFCStats collector
+    """
+    if stats is not None:
+        stats.distanceRecomputes += len(trajectories)
+    completed = answers[trajectories]
+    undecided = completed == UNDECIDED
+    completed[undecided] = letters[undecided]
+    answers[trajectories] = completed
+    distances[trajectories] = np.count_nonzero(completed[:, None, :] != tables.matrix[None, :, :], axis=2)
+
+
+def runTrajectoryBatch(tables, numTrajectories, maximumDistance, rng, stats=None):
+    """
+    Run numTrajectories independent randomized WFC-CSP trajectories at once,
+    one per row. Every step, each row picks a random input string at maximum
+    distance and decides the best scoring undecided position of that string.
+    A row whose maximum distance string has no slack left collapses to that
+    string and stops early; the slack of a row never drops below zero.
+
+    :param tables: RestartTables of the instance
+    :param numTrajectories: number of trajectories in the batch
+    :param maximumDistance: maximum Hamming distance allowed
+    :param rng: numpy random Generator
+    :param stats: optional WFCStats collector; a vectorized step scans the
+                  whole score row of L entries of each trajectory
+    :return: (numTrajectories x L answers, numTrajectories x K distances)
+    """
+    if stats is not None:
+        stats.trajectories += numTrajectories
+    answers = np.full((numTrajectories, tables.stringLength), UNDECIDED, dtype=np.uint8)
+    decided = np.zeros((numTrajectories, tables.stringLength), dtype=bool)
+    distances = np.full((numTrajectories, tables.numStrings), tables.stringLength, dtype=np.intp)
+
+    # trajectories still deciding positions
+    active = np.arange(numTrajectories)
+    for step in range(tables.stringLength):
+        undecidedCount = tables.stringLength - step
+        activeDistances = distances[active]
+        slack = maximumDistance + undecidedCount - activeDistances.max(axis=1)
+
+        collapse = slack == 0
+        if collapse.any():
+            strings = randomArgmax(activeDistances[collapse], rng)
+            completeTrajectories(tables, answers, distances, active[collapse], tables.matrix[strings], stats)
+            if stats is not None:
+                stats.tieBreakDraws += len(strings)
+
+            remaining = slack > 0
+            active = active[remaining]
+            activeDistances = activeDistances[remaining]
+            if len(active) == 0:
+                break
+
+        strings = randomArgmax(activeDistances, rng)
+
+        scores = tables.stringScores[strings]
+        scores[decided[active]] = -1
+        positions = randomArgmax(scores, rng)
+
+        letters = tables.matrix[strings, positions]
+        answers[active, positions] = letters
+        decided[active, positions] = True
+        matches = tables.columns[positions] == letters[:, None]
+        distances[active] -= matches
+
+        if stats is not None:
+            stats.positionsDecided += len(active)
+            stats.tieBreakDraws += 2 * len(active)
+            stats.scoreboardScans += len(active) * tables.stringLength
+            stats.distanceUpdates += int(np.count_nonzero(matches))
+
+    return answers, distances
@@ -0,0 +1,159 @@
+import contextlib
+import csv
+import json
+import os
+
+
+def fsync_directory(dirname):
+    """
+    make a rename or a new file in dirname durable
+    """
+    try:
+        fd = os.open(dirname or ".", os.O_RDONLY)
+    except OSError:
+        # directories cannot be opened on some platforms
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def atomic_output(filename):
+    """
+    write filename atomically: the caller writes to the yielded temporary file
+    name, which replaces filename only once it is complete and on disk, so a
+    crash never leaves a truncated filename behind
+    """
+    root, ext = os.path.splitext(filename)
+    tempFilename = "%s.%d.tmp%s" % (root, os.getpid(), ext)
+    try:
+        yield tempFilename
+        with open(tempFilename, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tempFilename, filename)
+    except BaseException:
+        if os.path.exists(tempFilename):
+            os.remove(tempFilename)
+        raise
+    fsync_directory(os.path.dirname(filename))
+
+
+class SweepJournal(object):
+    """
+    Append-only JSON lines checkpoint of a comparison sweep.
+
+    The first line is a header with the sweep arguments. Every following
+    line is either the per case records of one algorithm in one sweep cell,
+    or the results of a completed cell. Every line is flushed and fsynced
+    before the call returns; a truncated last line left by a crash is
+    dropped on load.
+    """
+    def __init__(self, filename, header):
+        self.filename = filename
+        # (algorithm, cell) -> {case index: record}
+        self.caseRecords = {}
+        # cell -> list of result rows
+        self.cellResults = {}
+
+        header = json.loads(json.dumps(header))
+        if os.path.exists(filename):
+            journalHeader = self.load()
+            assert journalHeader == header, \
+                "Journal %s was written with other arguments, remove it to start over" % filename
+            self.file = open(filename, "a")
+        else:
+            self.file = open(filename, "a")
+            self.append({"type": "header", "header": header})
+            fsync_directory(os.path.dirname(filename))
+
+    def load(self):
+        """
+        read back the journal
+        :return: header of the journal
+        """
+        header = None
+        goodSize = 0
+        with open(self.filename, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                goodSize += len(line)
+                if entry["type"] == "header":
+                    header = entry["header"]
+                elif entry["type"] == "cases":
+                    cases = self.caseRecords.setdefault((entry["algorithm"], tuple(entry["cell"])), {})
+                    for record in entry["records"]:
+                        cases[record["Testcase No."]] = record
+                elif entry["type"] == "cell":
+                    self.cellResults[tuple(entry["cell"])] = entry["results"]
+
+        if goodSize < os.path.getsize(self.filename):
+            # drop the partial line of an interrupted write
+            with open(self.filename, "r+b") as f:
+                f.truncate(goodSize)
+        return header
+
+    def append(self, entry):
+        line = json.dumps(entry) + "\n"
+        self.file.write(line)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def record_cases(self, algorithm, cell, records):
+        """
+        checkpoint finished test cases of a sweep cell
+        """
+        if not records:
+            return
+        cases = self.caseRecords.setdefault((algorithm, tuple(cell)), {})
+        for record in records:
+            cases[record["Testcase No."]] = record
+        self.append({"type": "cases", "algorithm": algorithm, "cell": list(cell), "records": records})
+
+    def record_cell(self, cell, results):
+        """
+        checkpoint the results of a completed sweep cell
+        """
+        self.cellResults[tuple(cell)] = results
+        self.append({"type": "cell", "cell": list(cell), "results": results})
+
+    def cases(self, algorithm, cell):
+        """
+        :return: {case index: record} of the checkpointed cases
+        """
+        return dict(self.caseRecords.get((algorithm, tuple(cell)), {}))
+
+    def close(self):
+        self.file.close()
+
+
+class ResultsTable(object):
+    """
+    Append-only CSV table of sweep results, one row per result of a
+    completed cell. The table is written once from the rows already known
+    (e.g. read back from the journal when resuming) and then only appended to.
+    """
+    def __init__(self, filename, columns, rows=()):
+        self.filename = filename
+        self.columns = columns
+        with atomic_output(filename) as tempFilename:
+            with open(tempFilename, "w", newline="") as f:
+                writer = csv.DictWriter(f, columns, restval="", extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(rows)
+        self.file = open(filename, "a", newline="")
+        self.writer = csv.DictWriter(self.file, columns, restval="", extrasaction="ignore")
+
+    def append(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,173 @@
+import cProfile
+import glob
+import json
+import os
+import pstats
+import signal
+import sys
+
+
+class SpanTimers(object):
+    """
+    Accumulated time and number of calls of named phases, measured with
+    perf_counter_ns by the code of the phases when a SpanTimers is passed.
+    """
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+
+    def add(self, name, elapsed):
+        """
+        :param elapsed: nanoseconds spent in one call of phase name
+        """
+        self.totals[name] = self.totals.get(name, 0) + elapsed
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def merge(self, other):
+        for name in other.totals:
+            self.totals[name] = self.totals.get(name, 0) + other.totals[name]
+            self.counts[name] = self.counts.get(name, 0) + other.counts[name]
+
+    def toState(self):
+        return {"totals": self.totals, "counts": self.counts}
+
+    @staticmethod
+    def fromState(state):
+        spans = SpanTimers()
+        spans.totals = dict(state["totals"])
+        spans.counts = dict(state["counts"])
+        return spans
+
+    def asDict(self):
+        """
+        :return: {phase: {"calls", "seconds", "mean seconds"}}
+        """
+        result = dict()
+        for name in sorted(self.totals):
+            result[name] = {"calls": self.counts[name],
+                            "seconds": self.totals[name] / 1e9,
+                            "mean seconds": self.totals[name] / 1e9 / self.counts[name]}
+        return result
+
+
+class StackSampler(object):
+    """
+    Statistical profiler: every interval seconds of process CPU time a SIGPROF
+    signal records the Python stack of the main thread. The stacks are
+    written in the collapsed format of flamegraph tools, one
+    "root;caller;callee count" line per distinct stack. Stacks start at the
+    frame that started the sampler, so the frames of the caller (or of the
+    parent of a forked worker process) are left out.
+
+    Needs signal.setitimer, i.e. not available on Windows; start and stop
+    then do nothing.
+    """
+    available = hasattr(signal, "setitimer") and hasattr(signal, "SIGPROF")
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = {}
+        self.previousHandler = None
+        self.rootFrame = None
+
+    def sample(self, signum, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append("%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+            if frame is self.rootFrame:
+                break
+            frame = frame.f_back
+        stack = ";".join(reversed(names))
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def start(self, rootFrame=None):
+        """
+        :param rootFrame: outermost frame of the sampled stacks, the caller
+                          of start if None
+        """
+        if not self.available:
+            return
+        self.rootFrame = rootFrame if rootFrame is not None else sys._getframe(1)
+        self.previousHandler = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        if not self.available:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self.previousHandler)
+        self.rootFrame = None
+
+    def write(self, filename):
+        with open(filename, "w") as f:
+            for stack, count in sorted(self.stacks.items()):
+                print("%s %d" % (stack, count), file=f)
+
+
+class CellProfiler(object):
+    """
+    Profile the code run inside the with block: writes <prefix>.pstats
+    (cProfile), <prefix>.collapsed (StackSampler) and <prefix>.spans.json
+    (the spans timers, to be passed to the profiled code).
+    """
+    def __init__(self, prefix, interval=0.001):
+        self.prefix = prefix
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(interval)
+        self.spans = SpanTimers()
+
+    def __enter__(self):
+        self.sampler.start(sys._getframe(1))
+        self.profile.enable()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.profile.disable()
+        self.sampler.stop()
+        self.profile.dump_stats(self.prefix + ".pstats")
+        self.sampler.write(self.prefix + ".collapsed")
+        with open(self.prefix + ".spans.json", "w") as f:
+            json.dump(self.spans.toState(), f)
+        return False
+
+
+def mergeProfiles(partPrefixes, prefix):
+    """
+    merge the files of CellProfiler runs with partPrefixes into one set of
+    files with prefix and remove the parts
+    """
+    pstatsFiles = [partPrefix + ".pstats" for partPrefix in partPrefixes]
+    if not pstatsFiles:
+        return
+    stats = pstats.Stats(*pstatsFiles)
+    stats.dump_stats(prefix + ".pstats")
+
+    stacks = {}
+    spans = SpanTimers()
+    for partPrefix in partPrefixes:
+        with open(partPrefix + ".collapsed") as f:
+            for line in f:
+                stack, count = line.rstrip("\n").rsplit(" ", 1)
+                stacks[stack] = stacks.get(stack, 0) + int(count)
+        with open(partPrefix + ".spans.json") as f:
+            spans.merge(SpanTimers.fromState(json.load(f)))
+    with open(prefix + ".collapsed", "w") as f:
+        for stack, count in sorted(stacks.items()):
+            print("%s %d" % (stack, count), file=f)
+    with open(prefix + ".spans.json", "w") as f:
+        json.dump(spans.asDict(), f, indent=2)
+
+    for partPrefix in partPrefixes:
+        for extension in (".pstats", ".collapsed", ".spans.json"):
+            os.remove(partPrefix + extension)
+
+
+def removeParts(prefix):
+    """
+    remove the files of the CellProfiler parts of prefix, e.g. the ones left
+    by an interrupted run
+    """
+    for extension in (".pstats", ".collapsed", ".spans.json"):
+        for filename in glob.glob(glob.escape(prefix) + ".part*" + extension):
+            os.remove(filename)
@@ -0,0 +1,277 @@
+import random
+
+import numpy as np
+
+from randomSource import asRandom
+
+
+class LetterCounts(object):
+    """
+    Letter frequency and position index tables of an EncodedInstance.
+
+    counts[position, code] is the number of input strings with letter code at
+    position. The inverted index keeps, for every (position, code) cell, the
+    indexes of those input strings in one flat array: the strings of a cell
+    are indexes[offsets[cell]:offsets[cell + 1]] with cell = position * A + code.
+    """
+    def __init__(self, instance, stats=None):
+        """
+        :param stats: optional WFCStats collector, counts the build
+        """
+        if stats is not None:
+            stats.tableBuilds += 1
+        matrix = instance.matrix
+        numStrings, stringLength = matrix.shape
+        alphabetSize = len(instance.codec)
+        assert matrix.max(initial=0) < alphabetSize, "Input strings contain letters outside the alphabet"
+
+        self.numStrings = numStrings
+        self.stringLength = stringLength
+        self.alphabetSize = alphabetSize
+
+        # cell key of every input string letter, position major
+        keys = matrix.T.astype(np.intp) + (np.arange(stringLength, dtype=np.intp) * alphabetSize)[:, None]
+        keys = keys.ravel()
+
+        self.counts = np.bincount(keys, minlength=stringLength * alphabetSize).reshape(stringLength, alphabetSize)
+        self.offsets = np.zeros(stringLength * alphabetSize + 1, dtype=np.intp)
+        np.cumsum(self.counts.ravel(), out=self.offsets[1:])
+
+        # a stable sort keeps the string indexes of a cell in increasing order
+        order = np.argsort(keys, kind="stable")
+        self.indexes = (order % numStrings).astype(np.int32)
+
+    def stringsWithLetter(self, position, code):
+        """
+        :return: indexes of the input strings with letter code at position
+        """
+        cell = position * self.alphabetSize + code
+        return self.indexes[self.offsets[cell]:self.offsets[cell + 1]]
+
+    def freqTable(self):
+        """
+        :return: letterFreqTable in the dict of dict form of calculateLetterFreq
+        """
+        letterFreqTable = {}
+        for position, row in enumerate(self.counts.tolist()):
+            letterFreqTable[position] = dict(enumerate(row))
+        return letterFreqTable
+
+    def positionTable(self):
+        """
+        :return: letterPositionTable in the dict of dict form of calculateLetterFreq
+        """
+        letterPositionTable = {}
+        for position in range(self.stringLength):
+            alphabetIndexTable = {}
+            for code in range(self.alphabetSize):
+                alphabetIndexTable[code] = self.stringsWithLetter(position, code).tolist()
+            letterPositionTable[position] = alphabetIndexTable
+        return letterPositionTable
+
+
+class WFCStats(object):
+    """
+    Optional operation counters of WFC-CSP runs. They count work instead of
+    time, so they compare across machines. One collector can be passed to
+    many runs, e.g. all tries of a test case or all test cases of a cell.
+    """
+    def __init__(self):
+        # solveWithRestarts calls, counters are reported per solve
+        self.solves = 0
+        # single runs and batch trajectories, and the retries among them
+        self.trajectories = 0
+        self.retries = 0
+        self.positionsDecided = 0
+        # scoreboard entries looked at to find the best (position, letter)
+        self.scoreboardScans = 0
+        # changes of the distance of one input string
+        self.distanceUpdates = 0
+        # random draws breaking ties
+        self.tieBreakDraws = 0
+        # recomputations of all K distances of a completed answer
+        self.distanceRecomputes = 0
+        # builds of the per instance tables: LetterCounts, Scoreboard and
+        # RestartTables
+        self.tableBuilds = 0
+
+    def merge(self, other):
+        for name, value in other.__dict__.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def toState(self):
+        """
+        :return: JSON serializable state of the collector
+        """
+        return dict(self.__dict__)
+
+    @staticmethod
+    def fromState(state):
+        stats = WFCStats()
+        stats.__dict__.update(state)
+        return stats
+
+    def asDict(self):
+        """
+        :return: the counters per solve as result columns
+        """
+        solves = max(self.solves, 1)
+        result = dict()
+        result["WFC Trajectories"] = self.trajectories / solves
+        result["WFC Retries"] = self.retries / solves
+        result["WFC Positions Decided"] = self.positionsDecided / solves
+        result["WFC Scoreboard Scans"] = self.scoreboardScans / solves
+        result["WFC Distance Updates"] = self.distanceUpdates / solves
+        result["WFC Tie Break Draws"] = self.tieBreakDraws / solves
+        result["WFC Distance Recomputes"] = self.distanceRecomputes / solves
+        result["WFC Table Builds"] = self.tableBuilds / solves
+        return result
+
+
+def positionMask(flags):
+    """
+    :param flags: boolean array over the positions
+    :return: int bitmask with bit p set where flags[p] is True
+    """
+    return int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+
+
+def pickRandomBit(mask, rng=None):
+    """
+    :param mask: non-zero int bitmask
+    :param rng: random source, the module level random if None
+    :return: uniformly chosen set bit position of mask
+    """
+    if rng is None:
+        rng = random
+    pick = rng.randrange(bin(mask).count("1"))
+    for _ in range(pick):
+        # clear the lowest set bit
+        mask &= mask - 1
+    return (mask & -mask).bit_length() - 1
+
+
+class Scoreboard(object):
+    """
+    Incremental scoreboard of the undecided positions.
+
+    buckets[code][freq] is the bitmask of undecided positions whose letter
+    code has frequency freq, so deciding a position clears one bit in each
+    of the |alphabet| buckets it is in. stringMasks[index][code] is the
+    bitmask of positions where input string index has letter code.
+    """
+    def __init__(self, letterCounts, instance, rng=None, stats=None):
+        if stats is not None:
+            stats.tableBuilds += 1
+        self.matrix = instance.matrix
+        self.rng = asRandom(rng)
+        self.stats = stats
+        self.counts = letterCounts.counts.tolist()
+        alphabetSize = letterCounts.alphabetSize
+
+        self.buckets = [[0] * (letterCounts.numStrings + 1) for _ in range(alphabetSize)]
+        for position, row in enumerate(self.counts):
+            bit = 1 << position
+            for code, freq in enumerate(row):
+                self.buckets[code][freq] |= bit
+
+        self.stringMasks = []
+        for string in instance.matrix:
+            self.stringMasks.append([positionMask(string == code) for code in range(alphabetSize)])
+
+        # no undecided position has a letter with higher frequency than topFreq
+        self.topFreq = letterCounts.numStrings
+
+    def remove(self, position):
+        """
+        remove the entries of a decided position from the scoreboard
+        """
+        clear = ~(1 << position)
+        buckets = self.buckets
+        for code, freq in enumerate(self.counts[position]):
+            buckets[code][freq] &= clear
+
+    def findMaxLetter(self, stringIndex):
+        """
+        find the highest scoring undecided (position, letter) that matches input
+        string stringIndex, ties are broken randomly
+        :return: [position, letter code, score] or None if no position is undecided
+        """
+        masks = self.stringMasks[stringIndex]
+        buckets = self.buckets
+        startFreq = self.topFreq
+        for freq in range(startFreq, -1, -1):
+            matches = 0
+            levelEmpty = True
+            for code in range(len(masks)):
+                bucket = buckets[code][freq]
+                if bucket:
+                    levelEmpty = False
+                    matches |= bucket & masks[code]
+            if levelEmpty and freq == self.topFreq:
+                self.topFreq -= 1
+            if matches:
+                if self.stats is not None:
+                    self.stats.scoreboardScans += (startFreq - freq + 1) * len(masks)
+                position = pickRandomBit(matches, self.rng)
+                return [position, int(self.matrix[stringIndex, position]), freq]
+        return None
+
+
+class DistanceTracker(object):
+    """
+    Hamming distances of the input strings to the current answer, kept in
+    buckets indexed by distance.
+
+    buckets[distance] lists the input strings at that distance and slots[index]
+    is the place of input string index in its bucket, so a string moves to
+    the next bucket in O(1) and a random string at maximum distance is picked
+    in O(1).
+    """
+    def __init__(self, distances, rng=None):
+        self.rng = asRandom(rng)
+        self.distances = list(distances)
+        self.buckets = [[] for _ in range(max(self.distances) + 1)]
+        self.slots = [0] * len(self.distances)
+        for index, distance in enumerate(self.distances):
+            self.slots[index] = len(self.buckets[distance])
+            self.buckets[distance].append(index)
+        self.maxDistance = len(self.buckets) - 1
+
+    def decrease(self, index):
+        """
+        reduce the distance of input string index by 1
+        """
+        distance = self.distances[index]
+        bucket = self.buckets[distance]
+
+        # move the last string of the bucket into the slot of index
+        last = bucket.pop()
+        if last != index:
+            slot = self.slots[index]
+            bucket[slot] = last
+            self.slots[last] = slot
+
+        self.distances[index] = distance - 1
+        lower = self.buckets[distance - 1]
+        self.slots[index] = len(lower)
+        lower.append(index)
+
+        while not self.buckets[self.maxDistance]:
+            self.maxDistance -= 1
+
+    def update(self, stringIndexes):
+        """
+        :param stringIndexes: the input strings that now match the answer at the
+                              decided position
+        """
+        for index in stringIndexes:
+            self.decrease(index)
+
+    def getMaxDistStr(self):
+        """
+        :return: [input string index, distance] of a random input string at
+                 maximum distance
+        """
+        index = self.rng.choice(self.buckets[self.maxDistance])
+        return [index, self.maxDistance]